@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,9 +13,15 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
 
-    # Сервер
+    # Сервер. В production (DEBUG=false) запускается WEB_CONCURRENCY процессов
+    # uvicorn с uvloop и httptools, в разработке - один процесс с --reload
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    WEB_CONCURRENCY: int = 1
+    # Адреса прокси (через запятую, "*" - любые), которым uvicorn доверяет
+    # X-Forwarded-For/X-Forwarded-Proto. Адрес клиента нужен лимитеру входа по IP:
+    # без этой настройки все клиенты за прокси получают адрес прокси
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
 
     # База данных PostgreSQL
     POSTGRES_USER: str
@@ -24,11 +30,96 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5432
     POSTGRES_DB: str
 
+    # Пул соединений одного процесса. При DATABASE_MAX_CONNECTIONS > 0 это общий
+    # бюджет соединений приложения к серверу бд (ниже max_connections Postgres
+    # за вычетом соединений других клиентов): он делится на WEB_CONCURRENCY
+    # процессов, DATABASE_POOL_SIZE и DATABASE_MAX_OVERFLOW только ограничивают долю процесса
+    DATABASE_POOL_SIZE: int = 20
+    DATABASE_MAX_OVERFLOW: int = 40
+    DATABASE_MAX_CONNECTIONS: int = 0
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_ECHO: bool = False
+
+    # Реплика только для чтения (не задан хост - все запросы идут в основную бд).
+    # Локально можно указать тот же сервер: чтение пойдет через отдельный пул
+    POSTGRES_REPLICA_HOST: Optional[str] = None
+    POSTGRES_REPLICA_PORT: int = 5432
+    # Сколько секунд после изменения клиент читает из основной бд (read-your-writes)
+    READ_YOUR_WRITES_SECONDS: int = 5
+
     # JWT
     JWT_SECRET: str
+    # HS256 | EdDSA | RS256. Для асимметричных алгоритмов нужны ключи в PEM,
+    # для проверки токенов в других сервисах достаточно открытого ключа
     ALGORITHM: str = "HS256"
+    JWT_PRIVATE_KEY_PATH: Optional[str] = None
+    JWT_PUBLIC_KEY_PATH: Optional[str] = None
+    # Реализация JWT: native (собственная, быстрая) | jose (python-jose, только HS256)
+    TOKEN_CODEC: str = "native"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Как часто воркер догружает отзывы сессий, сделанные другими воркерами
+    REVOCATION_SYNC_INTERVAL_SECONDS: int = 5
+    # Кеш проверенных токенов (0 - отключен)
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # Хеширование паролей (0 воркеров - ядра поровну на каждый процесс uvicorn)
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+
+    # Политика хеширования: bcrypt | argon2, стоимость - раунды bcrypt или time_cost argon2.
+    # При PASSWORD_HASH_TARGET_MS > 0 стоимость подбирается при старте под целевую задержку
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    PASSWORD_HASH_COST: int = 12
+    PASSWORD_HASH_TARGET_MS: int = 0
+
+    # Ограничение входа и регистрации до хеширования пароля:
+    # token bucket по логину и по IP (попыток в минуту и запас на всплеск)
+    # и лимит одновременных операций с паролем (0 - удвоенное число воркеров хеширования)
+    AUTH_LIMITER_ENABLED: bool = True
+    AUTH_LOGIN_ATTEMPTS_PER_MINUTE: int = 10
+    AUTH_LOGIN_BURST: int = 10
+    AUTH_IP_ATTEMPTS_PER_MINUTE: int = 60
+    AUTH_IP_BURST: int = 30
+    AUTH_MAX_CONCURRENT_HASHES: int = 0
+    AUTH_LIMITER_MAX_KEYS: int = 100000
+
+    # Кеш аутентифицированных пользователей (0 - кеш выключен).
+    # Изменения из других воркеров сверяются с бд раз в USER_CACHE_SYNC_INTERVAL_SECONDS,
+    # это предел задержки деактивации при нескольких воркерах (0 - только по TTL)
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_SYNC_INTERVAL_SECONDS: int = 1
+
+    # Отложенная пакетная запись last_login
+    LAST_LOGIN_FLUSH_INTERVAL_MS: int = 1000
+    LAST_LOGIN_FLUSH_MAX_ENTRIES: int = 500
+
+    # Выгрузка пользователей: строк в одной порции серверного курсора
+    USERS_EXPORT_BATCH_SIZE: int = 1000
+
+    # Импорт пользователей: строк в одной порции COPY + INSERT ... SELECT
+    USERS_IMPORT_BATCH_SIZE: int = 5000
+
+    # Быстрая сериализация ответов через orjson без повторной валидации DTO
+    FAST_JSON_RESPONSES: bool = False
+
+    # Метрики в формате Prometheus на /metrics
+    METRICS_ENABLED: bool = True
+
+    # Учет запросов к бд на HTTP-запрос: заголовок Server-Timing, журнал медленных
+    # запросов (0 - выключен) и бюджет запросов эндпоинтов. В строгом режиме
+    # (для тестов) превышение бюджета поднимает исключение
+    SERVER_TIMING_ENABLED: bool = True
+    SQL_SLOW_QUERY_MS: int = 200
+    SQL_QUERY_BUDGET_STRICT: bool = False
+
+    # Фоновая проверка бд для /health/ready
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 5
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2
+    # Сколько неудачных проверок подряд переводят приложение в "не готово"
+    HEALTH_FAILURE_THRESHOLD: int = 3
 
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = [
@@ -48,6 +139,28 @@ class Settings(BaseSettings):
             f"{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    @property
+    def DATABASE_REPLICA_URL(self) -> Optional[str]:
+        if not self.POSTGRES_REPLICA_HOST:
+            return None
+        return (
+            f"postgresql+asyncpg://{self.POSTGRES_USER}:"
+            f"{self.POSTGRES_PASSWORD}@{self.POSTGRES_REPLICA_HOST}:"
+            f"{self.POSTGRES_REPLICA_PORT}/{self.POSTGRES_DB}"
+        )
+
+    @property
+    def DATABASE_POOL_LIMITS(self) -> tuple[int, int]:
+        """pool_size и max_overflow одного процесса"""
+        pool_size = self.DATABASE_POOL_SIZE
+        max_overflow = self.DATABASE_MAX_OVERFLOW
+        if self.DATABASE_MAX_CONNECTIONS <= 0:
+            return pool_size, max_overflow
+
+        per_worker = max(self.DATABASE_MAX_CONNECTIONS // max(self.WEB_CONCURRENCY, 1), 1)
+        pool_size = min(pool_size, per_worker)
+        return pool_size, min(max_overflow, per_worker - pool_size)
+
     @property
     def SYNC_DATABASE_URL(self) -> str:
         return (
@@ -1,3 +1,4 @@
 from .user import *
 from .email import *
 from .admin import *
+from .imports import *
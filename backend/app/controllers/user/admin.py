@@ -1,16 +1,51 @@
 from app.models import UserModel, UserRole
-from app.schemas.user import UserOutDto, UserInChangeRoleDto, ChangeUserActivityInDto
+from app.schemas.user import (
+    UserOutDto,
+    UserInChangeRoleDto,
+    ChangeUserActivityInDto,
+    UserInBulkChangeRoleDto,
+    BulkChangeUserActivityInDto,
+    BulkChangeStatus,
+    UserBulkChangeResultDto,
+    UserBulkChangeReportDto,
+    UserFilterDto,
+    UserExportQueryDto,
+    UsersFileFormat,
+)
+from app.services.user_cache import user_cache
+from app.database.database import ReplicaSessionLocal
+from app.config import settings
+from app.repositories.user import (
+    USER_OUT_COLUMNS,
+    id_in,
+    get_user_out,
+    update_user,
+    update_users,
+)
+from .user import user_filter_conditions
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import AsyncIterator, Callable, Optional
+import json
+import csv
+import io
+import zlib
 
 
-async def change_role(
-    dto: UserInChangeRoleDto, user: UserModel, session: AsyncSession
-) -> UserOutDto:
-    # Проверки у пользователя, который изменяет роль
+EXPORT_COLUMNS = USER_OUT_COLUMNS
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+# Роли, которые модератор не может изменять и назначать
+MODERATOR_PROTECTED_ROLES = (UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.MODERATOR)
+
+
+def _check_admin_rights(user: UserOutDto) -> None:
+    # Проверки у пользователя, который изменяет данные
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
@@ -20,41 +55,63 @@ async def change_role(
             detail="У пользователя недостаточно прав на изменеине данных",
         )
 
-    query = select(UserModel).where(UserModel.id == dto.user_id)
-    result = await session.execute(query)
-    user_to_change = result.scalar_one_or_none()
-
-    if not user_to_change:
-        raise HTTPException(status_code=404, detail="Пользователь не найден")
 
+def check_is_admin(user: UserOutDto) -> None:
+    """Операции над всеми пользователями доступны только администраторам"""
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Пользователь деактивирован")
 
-    if user_to_change.id == user.id:
+    if user.role not in (UserRole.ADMIN, UserRole.SUPER_ADMIN):
         raise HTTPException(
-            status_code=400, detail="Нельзя изменить свою собственную роль"
+            status_code=403, detail="Операция доступна только администраторам"
         )
 
-    # Проверка иерархии для изменения роли
+
+def _role_change_conditions(user: UserOutDto) -> list:
+    """Иерархия для изменения роли в виде условий WHERE"""
+    conditions = [UserModel.id != user.id]
     if user.role == UserRole.MODERATOR:
-        if dto.role == UserRole.ADMIN:
-            raise HTTPException(
-                status_code=403, detail="Модератор не может назначать администраторов"
-            )
-        if user_to_change.role == UserRole.MODERATOR:
-            raise HTTPException(
-                status_code=403,
-                detail="Модератор не может изменять роли других модераторов",
-            )
+        conditions.append(UserModel.role.notin_(MODERATOR_PROTECTED_ROLES))
+    return conditions
+
+
+def _activity_change_conditions(user: UserOutDto) -> list:
+    """Иерархия для изменения активности в виде условий WHERE"""
+    conditions = [UserModel.id != user.id]
+    if user.role == UserRole.MODERATOR:
+        conditions.append(UserModel.role.notin_(MODERATOR_PROTECTED_ROLES))
+    return conditions
+
+
+async def change_role(
+    dto: UserInChangeRoleDto, user: UserOutDto, session: AsyncSession
+) -> UserOutDto:
+    _check_admin_rights(user)
+
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Пользователь деактивирован")
+
+    if user.role == UserRole.MODERATOR and dto.role in (
+        UserRole.ADMIN,
+        UserRole.SUPER_ADMIN,
+    ):
+        raise HTTPException(
+            status_code=403, detail="Модератор не может назначать администраторов"
+        )
 
     try:
-        if user_to_change.role == dto.role:
-            return UserOutDto.new(user_to_change)
-        else:
-            user_to_change.role = dto.role
+        # Права и иерархия проверяются в WHERE, изменение - за один запрос
+        user_to_change = await update_user(
+            session,
+            dto.user_id,
+            UserModel.role != dto.role,
+            *_role_change_conditions(user),
+            role=dto.role,
+        )
+        if user_to_change:
             await session.commit()
-            await session.refresh(user_to_change)
-            return UserOutDto.new(user_to_change)
+            user_cache.invalidate(user_to_change.id)
+            return user_to_change
 
     except Exception as e:
         await session.rollback()
@@ -62,22 +119,60 @@ async def change_role(
             status_code=500, detail=f"Ошибка при обновлении роли: {str(e)}"
         )
 
+    # Строка не обновлена - выясняем причину
+    user_to_change = await get_user_out(session, dto.user_id)
+
+    if not user_to_change:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    if user_to_change.id == user.id:
+        raise HTTPException(
+            status_code=400, detail="Нельзя изменить свою собственную роль"
+        )
+
+    if user.role == UserRole.MODERATOR:
+        if user_to_change.role == UserRole.MODERATOR:
+            raise HTTPException(
+                status_code=403,
+                detail="Модератор не может изменять роли других модераторов",
+            )
+        if user_to_change.role in (UserRole.ADMIN, UserRole.SUPER_ADMIN):
+            raise HTTPException(
+                status_code=403,
+                detail="Модератор не может изменять роли администраторов",
+            )
+
+    # Роль уже установлена
+    return user_to_change
+
 
 async def change_user_activity(
-    dto: ChangeUserActivityInDto, user: UserModel, session: AsyncSession
+    dto: ChangeUserActivityInDto, user: UserOutDto, session: AsyncSession
 ) -> UserOutDto:
-    if not user:
-        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    _check_admin_rights(user)
 
-    if user.role == UserRole.GUEST or user.role == UserRole.USER:
+    try:
+        user_to_change = await update_user(
+            session,
+            dto.user_id,
+            UserModel.is_active != dto.activity_flag,
+            *_activity_change_conditions(user),
+            is_active=dto.activity_flag,
+        )
+        if user_to_change:
+            await session.commit()
+            user_cache.invalidate(user_to_change.id)
+            return user_to_change
+
+    except Exception as e:
+        await session.rollback()
         raise HTTPException(
-            status_code=403,
-            detail="У пользователя недостаточно прав на изменеине данных",
+            status_code=500,
+            detail=f"Ошибка при изменения активности пользователя: {str(e)}",
         )
 
-    query = select(UserModel).where(UserModel.id == dto.user_id)
-    result = await session.execute(query)
-    user_to_change = result.scalar_one_or_none()
+    # Строка не обновлена - выясняем причину
+    user_to_change = await get_user_out(session, dto.user_id)
 
     if not user_to_change:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
@@ -88,7 +183,7 @@ async def change_user_activity(
         )
 
     if user.role == UserRole.MODERATOR:
-        if user_to_change.role == UserRole.ADMIN:
+        if user_to_change.role in (UserRole.ADMIN, UserRole.SUPER_ADMIN):
             raise HTTPException(
                 status_code=403,
                 detail="Модератор не может деактивировать аккаунт админа",
@@ -99,18 +194,218 @@ async def change_user_activity(
                 detail="Модератор не может деактивировать аккаунт другого модератора",
             )
 
+    # Активность уже установлена
+    return user_to_change
+
+
+async def _bulk_change(
+    user: UserOutDto,
+    user_ids: list[int],
+    column,
+    value,
+    conditions: list,
+    forbidden_detail: Callable[[UserRole], Optional[str]],
+    session: AsyncSession,
+) -> UserBulkChangeReportDto:
+    """
+    Изменение одного поля у множества пользователей: один UPDATE с иерархией
+    в WHERE и один SELECT для объяснения причин по не измененным строкам
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+
     try:
-        if user_to_change.is_active == dto.activity_flag:
-            return UserOutDto.new(user_to_change)
-        else:
-            user_to_change.is_active = dto.activity_flag
-            await session.commit()
-            await session.refresh(user_to_change)
-            return UserOutDto.new(user_to_change)
+        updated_ids = set(
+            await update_users(
+                session,
+                user_ids,
+                column != value,
+                *conditions,
+                **{column.key: value},
+            )
+        )
+        await session.commit()
 
     except Exception as e:
         await session.rollback()
         raise HTTPException(
             status_code=500,
-            detail=f"Ошибка при изменения активности пользователя: {str(e)}",
+            detail=f"Ошибка при массовом изменении пользователей: {str(e)}",
+        )
+
+    user_cache.invalidate(*updated_ids)
+
+    skipped_ids = [user_id for user_id in user_ids if user_id not in updated_ids]
+    skipped_roles = {}
+    if skipped_ids:
+        result = await session.execute(
+            select(UserModel.id, UserModel.role).where(id_in(skipped_ids))
+        )
+        skipped_roles = dict(result.tuples().all())
+
+    report = UserBulkChangeReportDto(updated=len(updated_ids))
+    for user_id in user_ids:
+        if user_id in updated_ids:
+            status, detail = BulkChangeStatus.UPDATED, None
+        elif user_id not in skipped_roles:
+            status, detail = BulkChangeStatus.NOT_FOUND, "Пользователь не найден"
+        elif user_id == user.id:
+            status, detail = BulkChangeStatus.SELF, "Нельзя изменить свой собственный аккаунт"
+        elif detail := forbidden_detail(skipped_roles[user_id]):
+            status = BulkChangeStatus.FORBIDDEN
+        else:
+            status, detail = BulkChangeStatus.UNCHANGED, None
+
+        report.results.append(
+            UserBulkChangeResultDto(user_id=user_id, status=status, detail=detail)
+        )
+
+    return report
+
+
+async def change_role_bulk(
+    dto: UserInBulkChangeRoleDto, user: UserOutDto, session: AsyncSession
+) -> UserBulkChangeReportDto:
+    _check_admin_rights(user)
+
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Пользователь деактивирован")
+
+    if user.role == UserRole.MODERATOR and dto.role in (
+        UserRole.ADMIN,
+        UserRole.SUPER_ADMIN,
+    ):
+        raise HTTPException(
+            status_code=403, detail="Модератор не может назначать администраторов"
         )
+
+    def forbidden_detail(role: UserRole) -> Optional[str]:
+        if user.role != UserRole.MODERATOR:
+            return None
+        if role in (UserRole.ADMIN, UserRole.SUPER_ADMIN):
+            return "Модератор не может изменять роли администраторов"
+        if role == UserRole.MODERATOR:
+            return "Модератор не может изменять роли других модераторов"
+        return None
+
+    return await _bulk_change(
+        user,
+        dto.user_ids,
+        UserModel.role,
+        dto.role,
+        _role_change_conditions(user),
+        forbidden_detail,
+        session,
+    )
+
+
+async def change_user_activity_bulk(
+    dto: BulkChangeUserActivityInDto, user: UserOutDto, session: AsyncSession
+) -> UserBulkChangeReportDto:
+    _check_admin_rights(user)
+
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Пользователь деактивирован")
+
+    def forbidden_detail(role: UserRole) -> Optional[str]:
+        if user.role != UserRole.MODERATOR:
+            return None
+        if role in (UserRole.ADMIN, UserRole.SUPER_ADMIN):
+            return "Модератор не может деактивировать аккаунт админа"
+        if role == UserRole.MODERATOR:
+            return "Модератор не может деактивировать аккаунт другого модератора"
+        return None
+
+    return await _bulk_change(
+        user,
+        dto.user_ids,
+        UserModel.is_active,
+        dto.activity_flag,
+        _activity_change_conditions(user),
+        forbidden_detail,
+        session,
+    )
+
+
+def _export_value(value):
+    if isinstance(value, UserRole):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def _export_batches(filters: UserFilterDto) -> AsyncIterator[list]:
+    """
+    Порции строк из серверного курсора. Сессия своя, так как
+    ответ стримится уже после выхода из зависимостей эндпоинта
+    """
+    query = (
+        select(*EXPORT_COLUMNS)
+        .where(*user_filter_conditions(filters))
+        .order_by(UserModel.id)
+    )
+    async with ReplicaSessionLocal() as session:
+        result = await session.stream(
+            query, execution_options={"yield_per": settings.USERS_EXPORT_BATCH_SIZE}
+        )
+        async for rows in result.partitions():
+            yield rows
+
+
+def _encode_ndjson(rows: list) -> bytes:
+    return "".join(
+        json.dumps(
+            {field: _export_value(value) for field, value in zip(EXPORT_FIELDS, row)},
+            ensure_ascii=False,
+        )
+        + "\n"
+        for row in rows
+    ).encode()
+
+
+def _encode_csv(rows: list) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_export_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def export_chunks(query_dto: UserExportQueryDto) -> AsyncIterator[bytes]:
+    """Выгрузка пользователей порциями байт с постоянным потреблением памяти"""
+    compressor = zlib.compressobj(wbits=31) if query_dto.gzip else None
+
+    def output(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if query_dto.format == UsersFileFormat.CSV:
+        encode = _encode_csv
+        yield output(_encode_csv([EXPORT_FIELDS]))
+    else:
+        encode = _encode_ndjson
+
+    async for rows in _export_batches(query_dto):
+        chunk = output(encode(rows))
+        if chunk:
+            yield chunk
+
+    if compressor:
+        yield compressor.flush()
+
+
+async def export_users(
+    query_dto: UserExportQueryDto, user: UserOutDto
+) -> StreamingResponse:
+    check_is_admin(user)
+
+    if query_dto.format == UsersFileFormat.CSV:
+        media_type, extension = "text/csv", "csv"
+    else:
+        media_type, extension = "application/x-ndjson", "ndjson"
+
+    headers = {"Content-Disposition": f'attachment; filename="users.{extension}"'}
+    if query_dto.gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        export_chunks(query_dto), media_type=media_type, headers=headers
+    )
@@ -1,15 +1,18 @@
-from jose.exceptions import ExpiredSignatureError
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException
 from datetime import datetime, timedelta, timezone
-from typing import Literal, TypeAlias
-from jose import jwt, JWTError
+from typing import Annotated, Literal, TypeAlias
 from os import environ
-from sqlalchemy import select
+import secrets
 
 from app.models.user import UserModel
-from app.database.database import get_db
+from app.schemas.user import UserOutDto, UserClaimsDto
+from app.database.database import DbSession
+from app.services.user_cache import user_cache
+from app.services.token_cache import token_cache
+from app.services.tokens import TokenError, TokenExpiredError, token_codec
+from app.services.revocations import revocation_store
+from app.repositories.user import get_user_out
 from app.config import settings
 
 
@@ -18,74 +21,156 @@ TokenType: TypeAlias = Literal["access"] | Literal["refresh"]
 OAUTH2_SCHEME = OAuth2PasswordBearer(tokenUrl="/users/login")
 
 
-def create_access_token(user: UserModel) -> str:
+def new_session_id() -> str:
+    """Идентификатор сессии: jti refresh-токена и sid выданных по нему access-токенов"""
+    return secrets.token_hex(16)
+
+
+def _issued_at(now: datetime) -> float:
+    """
+    iat с точностью до микросекунды, как у revoked_before в бд (NumericDate
+    допускает дробные секунды). С целыми секундами вход в ту же секунду после
+    смены пароля получал iat не позже момента отзыва, и новые токены сразу
+    считались отозванными
+    """
+    return now.timestamp()
+
+
+def create_access_token(user: UserModel, session_id: str) -> str:
     """Создание access token"""
+    now = datetime.now(timezone.utc)
     data = {
         "user_id": user.id,
         "login": user.login,
         "role": user.role.value if hasattr(user.role, "value") else str(user.role),
         "type": "access",
-        "exp": datetime.now(timezone.utc)
-        + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        "sid": session_id,
+        "iat": _issued_at(now),
+        "exp": now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     }
 
     # datetime в timestamp (секунды с эпохи)
     if isinstance(data["exp"], datetime):
         data["exp"] = int(data["exp"].timestamp())
 
-    return jwt.encode(data, settings.JWT_SECRET, algorithm=settings.ALGORITHM)
+    return token_codec.encode(data)
 
 
-def create_refresh_token(user: UserModel) -> str:
+def create_refresh_token(user: UserModel, session_id: str) -> str:
     """Создание refresh token"""
+    now = datetime.now(timezone.utc)
     data = {
         "user_id": user.id,
         "type": "refresh",
-        "exp": datetime.now(timezone.utc)
-        + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        "jti": session_id,
+        "iat": _issued_at(now),
+        "exp": now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
     }
 
     # datetime в timestamp
     if isinstance(data["exp"], datetime):
         data["exp"] = int(data["exp"].timestamp())
 
-    return jwt.encode(data, settings.JWT_SECRET, algorithm=settings.ALGORITHM)
+    return token_codec.encode(data)
+
+
+def decode_token(token: str) -> dict:
+    """
+    Проверка подписи и срока действия с кешем проверенных токенов.
+    При ошибке проверки пробрасывает TokenError, такие токены не кешируются
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = token_codec.decode(token)
+        token_cache.set(token, payload)
+    return payload
+
+
+def is_token_revoked(payload: dict) -> bool:
+    """Проверка по зеркалу отозванных сессий в памяти, без запроса в бд"""
+    return revocation_store.is_revoked(
+        payload.get("jti") or payload.get("sid"),
+        payload.get("user_id"),
+        payload.get("iat"),
+    )
 
 
 def verify_token(token: str, token_type: TokenType):
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET)
+        payload = decode_token(token)
         if payload.get("type") != token_type:
             print(f"TYPE of PAYLOAD: {payload.get('type')}")
             raise HTTPException(status_code=403, detail="Неверный тип токена!")
+        if is_token_revoked(payload):
+            raise HTTPException(status_code=401, detail="Сессия завершена!")
         return payload
-    except ExpiredSignatureError:
+    except TokenExpiredError:
         raise HTTPException(status_code=401, detail="Истекло время жизни токена!")
-    except JWTError:
+    except TokenError:
         raise HTTPException(status_code=401, detail="Токен невалиден!")
 
 
-async def get_current_user(
-    token: str = Depends(OAUTH2_SCHEME), db: Session = Depends(get_db)
-) -> UserModel:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=401,
         detail="Не удалось подтвердить учетные данные",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def _decode_access_token(token: str) -> dict:
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET)
-        user_id: str = payload.get("user_id")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    query = select(UserModel).where(UserModel.id == user_id)
-    result = await db.execute(query)
-    user = result.scalar_one_or_none()
+        payload = decode_token(token)
+    except TokenError:
+        raise _credentials_exception()
+
+    if payload.get("type") != "access" or payload.get("user_id") is None:
+        raise _credentials_exception()
+
+    if is_token_revoked(payload):
+        raise _credentials_exception()
+
+    return payload
+
+
+async def get_current_user(
+    db: DbSession, token: str = Depends(OAUTH2_SCHEME)
+) -> UserOutDto:
+    """Текущий пользователь по актуальным данным из кеша или бд"""
+    payload = _decode_access_token(token)
+    user_id: int = payload["user_id"]
+
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    user = await get_user_out(db, user_id)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
 
+    user_cache.set(user)
     return user
+
+
+async def get_current_user_claims(
+    token: str = Depends(OAUTH2_SCHEME),
+) -> UserClaimsDto:
+    """
+    Текущий пользователь только по claims access-токена, без запроса в бд.
+    Роль может устареть не более чем на ACCESS_TOKEN_EXPIRE_MINUTES,
+    деактивация пользователя до истечения токена не учитывается
+    """
+    payload = _decode_access_token(token)
+    try:
+        return UserClaimsDto(
+            id=payload["user_id"], login=payload["login"], role=payload["role"]
+        )
+    except (KeyError, ValueError):
+        raise _credentials_exception()
+
+
+# Зависимости для эндпоинтов:
+# CurrentUser - свежие данные пользователя (кеш + бд), для проверок прав на изменения
+# TokenUser - только claims токена, для читающих эндпоинтов, которым достаточно роли
+CurrentUser = Annotated[UserOutDto, Depends(get_current_user)]
+TokenUser = Annotated[UserClaimsDto, Depends(get_current_user_claims)]
@@ -2,16 +2,33 @@ from app.models import UserModel
 from app.schemas.user import (
     UserOutDto,
 )
+from app.services.user_cache import user_cache
+from app.repositories.user import get_user_out, update_user
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from fastapi import HTTPException
 import re
 
 
-async def set_email(email: str, user: UserModel, session: AsyncSession) -> UserOutDto:
-    regex = r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,7}"
+EMAIL_REGEX = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,7}")
 
+
+async def _get_user_for_email(user_id: int, session: AsyncSession) -> UserOutDto:
+    """Актуальная строка пользователя, если UPDATE не затронул ни одной строки"""
+    user = await get_user_out(session, user_id)
+
+    if not user:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Пользователь деактивирован")
+
+    return user
+
+
+async def set_email(email: str, user: UserOutDto, session: AsyncSession) -> UserOutDto:
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
@@ -20,59 +37,89 @@ async def set_email(email: str, user: UserModel, session: AsyncSession) -> UserO
 
     # Хоть и предполагается что на фронте также производятся проверки почты и других полей
     # все равно решил дополнительно проверить
-    if re.fullmatch(regex, email):
-        user.email = email
-        user.is_email_verified = False
-        await session.commit()
-        await session.refresh(user)
-        return UserOutDto.new(user)
-
-    else:
+    if not EMAIL_REGEX.fullmatch(email):
         raise HTTPException(status_code=400, detail="Неправильный формат почты")
 
+    try:
+        updated_user = await update_user(
+            session,
+            user.id,
+            UserModel.is_active.is_(True),
+            email=email,
+            is_email_verified=False,
+        )
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail="Такая почта уже используется")
 
-async def set_email_active(user: UserModel, session: AsyncSession) -> UserOutDto:
+    if not updated_user:
+        # Пользователь удален или деактивирован после аутентификации
+        await _get_user_for_email(user.id, session)
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    await session.commit()
+    user_cache.invalidate(user.id)
+    return updated_user
+
+
+async def set_email_active(user: UserOutDto, session: AsyncSession) -> UserOutDto:
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Пользователь деактивирован")
 
-    if not user.email:
+    updated_user = await update_user(
+        session,
+        user.id,
+        UserModel.is_active.is_(True),
+        UserModel.email.is_not(None),
+        UserModel.is_email_verified.is_(False),
+        is_email_verified=True,
+    )
+
+    if updated_user:
+        await session.commit()
+        user_cache.invalidate(user.id)
+        return updated_user
+
+    current_user = await _get_user_for_email(user.id, session)
+
+    if not current_user.email:
         raise HTTPException(
             status_code=400, detail="У пользователя не установлена почта"
         )
 
-    if user.is_email_verified:
-        return UserOutDto.new(user)
+    # Почта уже подтверждена
+    return current_user
 
-    else:
-        user.is_email_verified = True
-        await session.commit()
-        await session.refresh(user)
-        return UserOutDto.new(user)
 
-
-async def delete_email(user: UserModel, session: AsyncSession) -> UserOutDto:
+async def delete_email(user: UserOutDto, session: AsyncSession) -> UserOutDto:
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Пользователь деактивирован")
 
-    if not user.email:
-        raise HTTPException(
-            status_code=400, detail="У пользователя не установлена почта"
+    try:
+        updated_user = await update_user(
+            session,
+            user.id,
+            UserModel.is_active.is_(True),
+            UserModel.email.is_not(None),
+            email=None,
+            is_email_verified=False,
         )
+        if updated_user:
+            await session.commit()
+            user_cache.invalidate(user.id)
+            return updated_user
 
-    try:
-        user.email = None
-        user.is_email_verified = False
-        await session.commit()
-        await session.refresh(user)
-        return UserOutDto.new(user)
     except Exception as e:
         await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Ошибка при удалении почты: {str(e)}"
         )
+
+    await _get_user_for_email(user.id, session)
+    raise HTTPException(status_code=400, detail="У пользователя не установлена почта")
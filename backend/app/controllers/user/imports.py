@@ -0,0 +1,233 @@
+from app.models import UserModel, UserRole
+from app.schemas.user import (
+    UserInDto,
+    UserOutDto,
+    UsersFileFormat,
+    ImportRowStatus,
+    UserImportRowDto,
+    UserImportReportDto,
+)
+from app.services.passwords import password_hasher
+from app.config import settings
+from .admin import check_is_admin
+from .user import new_user_error
+
+from sqlalchemy import Integer, String, column, literal, select, table, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from typing import AsyncIterator, Optional
+import json
+import csv
+
+
+IMPORT_COLUMNS = ["line", "login", "nickname", "hashed_password"]
+
+# Длины колонок users: UserInDto допускает более длинный логин, а одна
+# слишком длинная строка роняет INSERT ... SELECT всей порции
+LOGIN_MAX_LENGTH = UserModel.__table__.c.login.type.length
+NICKNAME_MAX_LENGTH = UserModel.__table__.c.nickname.type.length
+
+# Временная таблица живет до конца транзакции одной порции
+import_staging = table(
+    "users_import",
+    column("line", Integer),
+    column("login", String),
+    column("nickname", String),
+    column("hashed_password", String),
+)
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Построчное чтение тела запроса без загрузки его целиком в память"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8", errors="replace").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+
+async def _iter_records(
+    chunks: AsyncIterator[bytes], file_format: UsersFileFormat
+) -> AsyncIterator[tuple[int, Optional[dict], Optional[str]]]:
+    """Записи файла: (номер строки, запись, ошибка разбора)"""
+    header = None
+    line_number = 0
+
+    async for line in _iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+
+        try:
+            if file_format == UsersFileFormat.CSV:
+                values = next(csv.reader([line]))
+                if header is None:
+                    header = values
+                    continue
+                record = dict(zip(header, values))
+            else:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("ожидается JSON-объект")
+        except (ValueError, csv.Error) as e:
+            yield line_number, None, f"Не удалось разобрать строку: {e}"
+            continue
+
+        yield line_number, record, None
+
+
+def _validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in e.errors()
+    )
+
+
+async def _load_batch(
+    batch: list[tuple[int, UserInDto]], session: AsyncSession
+) -> set[int]:
+    """
+    Хеширование паролей порции на всех ядрах, COPY во временную таблицу
+    и перенос в users одним INSERT ... SELECT. Возвращает номера созданных строк
+    """
+    hashed_passwords = await password_hasher.hash_many(
+        [user_in_dto.password for _, user_in_dto in batch]
+    )
+    records = [
+        (line, user_in_dto.login, user_in_dto.nickname, hashed_password)
+        for (line, user_in_dto), hashed_password in zip(batch, hashed_passwords)
+    ]
+
+    connection = await session.connection()
+    await connection.execute(
+        text(
+            "CREATE TEMP TABLE users_import ("
+            f"line integer, login varchar({LOGIN_MAX_LENGTH}), "
+            f"nickname varchar({NICKNAME_MAX_LENGTH}), hashed_password varchar(255)"
+            ") ON COMMIT DROP"
+        )
+    )
+
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        "users_import", records=records, columns=IMPORT_COLUMNS
+    )
+
+    query = (
+        insert(UserModel)
+        .from_select(
+            [
+                UserModel.login,
+                UserModel.nickname,
+                UserModel.hashed_password,
+                UserModel.role,
+                UserModel.is_active,
+                UserModel.is_email_verified,
+            ],
+            select(
+                import_staging.c.login,
+                import_staging.c.nickname,
+                import_staging.c.hashed_password,
+                literal(UserRole.USER, UserModel.role.type),
+                literal(True),
+                literal(False),
+            ).order_by(import_staging.c.line),
+        )
+        .on_conflict_do_nothing()
+        .returning(UserModel.login)
+    )
+    result = await session.execute(query)
+    created_logins = set(result.scalars().all())
+    await session.commit()
+
+    return {line for line, user_in_dto in batch if user_in_dto.login in created_logins}
+
+
+async def import_users(
+    chunks: AsyncIterator[bytes],
+    file_format: UsersFileFormat,
+    user: UserOutDto,
+    session: AsyncSession,
+) -> UserImportReportDto:
+    check_is_admin(user)
+
+    report = UserImportReportDto()
+    batch: list[tuple[int, UserInDto]] = []
+    seen_logins: set[str] = set()
+    seen_nicknames: set[str] = set()
+
+    def add_error(line: int, status: ImportRowStatus, detail: str) -> None:
+        if status == ImportRowStatus.CONFLICT:
+            report.conflicts += 1
+        else:
+            report.invalid += 1
+        report.errors.append(UserImportRowDto(line=line, status=status, detail=detail))
+
+    async def flush() -> None:
+        created_lines = await _load_batch(batch, session)
+        report.created += len(created_lines)
+        for line, user_in_dto in batch:
+            if line not in created_lines:
+                add_error(
+                    line,
+                    ImportRowStatus.CONFLICT,
+                    f"Логин '{user_in_dto.login}' или никнейм '{user_in_dto.nickname}' уже существует",
+                )
+        batch.clear()
+
+    try:
+        async for line, record, parse_error in _iter_records(chunks, file_format):
+            if parse_error:
+                add_error(line, ImportRowStatus.INVALID, parse_error)
+                continue
+
+            try:
+                user_in_dto = UserInDto.model_validate(record)
+            except ValidationError as e:
+                add_error(line, ImportRowStatus.INVALID, _validation_error(e))
+                continue
+
+            error = new_user_error(user_in_dto)
+            if error is None and len(user_in_dto.login) > LOGIN_MAX_LENGTH:
+                error = f"Логин не должен превышать {LOGIN_MAX_LENGTH} символов"
+            if error:
+                add_error(line, ImportRowStatus.INVALID, error)
+                continue
+
+            # Дубликаты внутри файла отсекаем до хеширования
+            if (
+                user_in_dto.login in seen_logins
+                or user_in_dto.nickname in seen_nicknames
+            ):
+                add_error(
+                    line, ImportRowStatus.CONFLICT, "Дубликат логина или никнейма в файле"
+                )
+                continue
+            seen_logins.add(user_in_dto.login)
+            seen_nicknames.add(user_in_dto.nickname)
+
+            batch.append((line, user_in_dto))
+            if len(batch) >= settings.USERS_IMPORT_BATCH_SIZE:
+                await flush()
+
+        if batch:
+            await flush()
+
+    except HTTPException:
+        await session.rollback()
+        raise
+
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при импорте пользователей: {e}. Создано до ошибки: {report.created}",
+        )
+
+    return report
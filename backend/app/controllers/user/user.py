@@ -5,120 +5,210 @@ from app.schemas.user import (
     UserTokensDto,
     UserChangeFieldInDto,
     UserField,
+    UserFilterDto,
+    UserPageDto,
+    UserPageQueryDto,
 )
 from .authentication import (
     create_refresh_token,
     create_access_token,
+    new_session_id,
     verify_token,
 )
 
-from sqlalchemy import select, exists
+from app.database.database import AsyncSessionLocal
+from app.repositories.user import (
+    select_users_out,
+    get_user_out,
+    get_users_out,
+    insert_user,
+    update_user,
+    delete_user as repository_delete_user,
+)
+from app.services.passwords import password_hasher
+from app.services.user_cache import user_cache
+from app.services.last_login import last_login_buffer
+from app.services.revocations import revocation_store
+from app.controllers.cookies import delete_cookies
+
+from sqlalchemy import select, exists, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from fastapi import HTTPException, status, Response
 from fastapi.security import OAuth2PasswordRequestForm
 import re
+import base64
+import asyncio
+import contextvars
+import logging
 from datetime import datetime, timezone
+from typing import Optional
 
 
-async def create_user(user_in_dto: UserInDto, session: AsyncSession) -> UserOutDto:
-    if not re.fullmatch(r"[A-Za-zА-Яа-яёЁ\s\-]+", user_in_dto.nickname):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Никнейм должно содержать только буквы, пробелы и дефисы.",
-        )
+logger = logging.getLogger(__name__)
+
+NICKNAME_REGEX = re.compile(r"[A-Za-zА-Яа-яёЁ\s\-]+")
+
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def _rehash_password(user_id: int, password: str, old_hash: str) -> None:
+    """Перехеширование пароля по текущей политике после успешного входа"""
+    try:
+        new_hash = await password_hasher.hash(password)
+        async with AsyncSessionLocal() as session:
+            # Условие на старый хеш защищает от гонки со сменой пароля,
+            # updated_at не трогаем - данные пользователя не менялись
+            await session.execute(
+                update(UserModel)
+                .where(UserModel.id == user_id, UserModel.hashed_password == old_hash)
+                .values(hashed_password=new_hash, updated_at=UserModel.updated_at)
+            )
+            await session.commit()
+    except Exception as e:
+        logger.warning(f"Не удалось перехешировать пароль пользователя {user_id}: {e}")
+
+
+def new_user_error(user_in_dto: UserInDto) -> Optional[str]:
+    """Проверки нового пользователя сверх ограничений UserInDto"""
+    if not NICKNAME_REGEX.fullmatch(user_in_dto.nickname):
+        return "Никнейм должно содержать только буквы, пробелы и дефисы."
 
     if len(user_in_dto.password) > 20:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Пароль должен быть не длиннее 20 символов.",
-        )
+        return "Пароль должен быть не длиннее 20 символов."
 
-    query = select(exists().where(UserModel.login == user_in_dto.login))
-    result = await session.execute(query)
-    if result.scalar():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Логин уже существует. Пожалуйста, выберите другой.",
-        )
+    return None
 
-    query = select(exists().where(UserModel.nickname == user_in_dto.nickname))
-    result = await session.execute(query)
-    if result.scalar():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Никнейм уже существует. Пожалуйста, выберите другой.",
-        )
 
-    user = UserModel(
+async def create_user(user_in_dto: UserInDto, session: AsyncSession) -> UserOutDto:
+    error = new_user_error(user_in_dto)
+    if error:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=error)
+
+    hashed_password = await password_hasher.hash(user_in_dto.password)
+
+    # Один запрос вместо проверок exists + INSERT + refresh,
+    # уникальность проверяет сама бд, поэтому гонки между регистрациями нет
+    user = await insert_user(
+        session,
         nickname=user_in_dto.nickname,
         login=user_in_dto.login,
-        bio=None,
-        last_login=None,
+        hashed_password=hashed_password,
     )
 
-    user.set_password(user_in_dto.password)
+    if user is None:
+        # Уточняем, что именно занято, только на редком пути конфликта
+        query = select(exists().where(UserModel.login == user_in_dto.login))
+        result = await session.execute(query)
+        if result.scalar():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Логин уже существует. Пожалуйста, выберите другой.",
+            )
 
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Никнейм уже существует. Пожалуйста, выберите другой.",
+        )
 
-    return UserOutDto.new(user)
+    await session.commit()
+    return user
 
 
 async def delete_user(user_id: int, session: AsyncSession) -> None:
-    query = select(UserModel).where(UserModel.id == user_id)
-    result = await session.execute(query)
-    user = result.scalar_one_or_none()
-
-    if not user:
+    if not await repository_delete_user(session, user_id):
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-    await session.delete(user)
     await session.commit()
+    user_cache.invalidate(user_id)
 
 
-async def get_users(session: AsyncSession) -> list[UserOutDto]:
-    query = select(UserModel)
-    result = await session.execute(query)
-    users = result.scalars().all()
+def _encode_cursor(user_id: int) -> str:
+    return base64.urlsafe_b64encode(str(user_id).encode()).decode().rstrip("=")
 
-    return [UserOutDto.new(user) for user in users]
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(cursor + padding).decode())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Невалидный курсор")
+
+
+def user_filter_conditions(filters: UserFilterDto) -> list:
+    """Условия WHERE для фильтров списка пользователей"""
+    conditions = []
+    if filters.role is not None:
+        conditions.append(UserModel.role == filters.role)
+    if filters.is_active is not None:
+        conditions.append(UserModel.is_active == filters.is_active)
+    if filters.is_email_verified is not None:
+        conditions.append(UserModel.is_email_verified == filters.is_email_verified)
+    if filters.created_from is not None:
+        conditions.append(UserModel.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        conditions.append(UserModel.created_at < filters.created_to)
+    return conditions
+
+
+async def get_users(query_dto: UserPageQueryDto, session: AsyncSession) -> UserPageDto:
+    # Keyset-пагинация по id: каждая страница - range scan по индексу,
+    # стоимость не зависит от номера страницы
+    query = select_users_out().where(*user_filter_conditions(query_dto))
+    if query_dto.cursor:
+        query = query.where(UserModel.id > _decode_cursor(query_dto.cursor))
+    query = query.order_by(UserModel.id).limit(query_dto.limit + 1)
+
+    users = await get_users_out(session, query)
+
+    next_cursor = None
+    if len(users) > query_dto.limit:
+        users = users[: query_dto.limit]
+        next_cursor = _encode_cursor(users[-1].id)
+
+    return UserPageDto.model_construct(items=users, next_cursor=next_cursor)
 
 
 async def login(
     response: Response, form_data: OAuth2PasswordRequestForm, session: AsyncSession
 ):
-    query = select(UserModel).where(UserModel.login == form_data.username)
-    result = await session.execute(query)
-    user = result.scalar_one_or_none()
+    query = select_users_out().add_columns(UserModel.hashed_password)
+    result = await session.execute(query.where(UserModel.login == form_data.username))
+    row = result.one_or_none()
 
-    if not user:
+    if not row:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-    elif not user.verify_password(form_data.password):
+    elif not await password_hasher.verify(form_data.password, row.hashed_password):
         raise HTTPException(status_code=401, detail="Неверный логин или пароль")
 
-    if not user.is_active:
+    if not row.is_active:
         raise HTTPException(
             status_code=403,
             detail="Пользователь деактивирован. Обратитесь к администратору.",
         )
 
-    try:
-        user.last_login = datetime.now(timezone.utc)
-        await session.commit()
-        await session.refresh(user)
-
-    except Exception as e:
-        await session.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Ошибка при обновлении last_login для пользователя {user.id}: {e}",
+    if password_hasher.needs_update(row.hashed_password):
+        # Пустой контекст: фоновая задача не учитывается в запросах к бд этого запроса
+        task = asyncio.create_task(
+            _rehash_password(row.id, form_data.password, row.hashed_password),
+            context=contextvars.Context(),
         )
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    # last_login пишется пакетно в фоне, в ответ отдаем время текущего входа
+    logged_in_at = datetime.now(timezone.utc)
+    last_login_buffer.record(row.id, logged_in_at)
+
+    user = UserOutDto.from_row(row)
+    user.last_login = logged_in_at
 
-    access_token = create_access_token(user)
-    refresh_token = create_refresh_token(user)
+    session_id = new_session_id()
+    access_token = create_access_token(user, session_id)
+    refresh_token = create_refresh_token(user, session_id)
 
     response.set_cookie(
         key="user_id",
@@ -153,7 +243,7 @@ async def login(
     )
 
     return UserTokensDto(
-        user_data=UserOutDto.new(user),
+        user_data=user,
         access_token=access_token,
         refresh_token=refresh_token,
     )
@@ -165,9 +255,7 @@ async def refresh(refresh_token: str, session: AsyncSession):
     if not user_id:
         raise HTTPException(status_code=401, detail="Невалидный токен")
 
-    query = select(UserModel).where(UserModel.id == user_id)
-    result = await session.execute(query)
-    user = result.scalar_one_or_none()
+    user = await get_user_out(session, user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
@@ -175,22 +263,42 @@ async def refresh(refresh_token: str, session: AsyncSession):
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Пользователь деактивирован")
 
-    return create_access_token(user)
+    # Токены, выданные до появления jti, продолжают работать в новой сессии
+    return create_access_token(user, payload.get("jti") or new_session_id())
+
+
+async def logout(response: Response, refresh_token: str, session: AsyncSession) -> None:
+    """Завершение сессии: отзыв refresh-токена и выданных по нему access-токенов"""
+    payload = verify_token(refresh_token, "refresh")
+    session_id = payload.get("jti")
+    if not session_id:
+        raise HTTPException(
+            status_code=400, detail="Токен выдан без идентификатора сессии"
+        )
+
+    revocation = revocation_store.revoke_session(
+        session,
+        session_id,
+        payload.get("user_id"),
+        datetime.fromtimestamp(payload["exp"], timezone.utc),
+    )
+    await session.commit()
+    revocation_store.remember(revocation)
+
+    await delete_cookies(response)
 
 
 async def get_user_by_id(user_id: int, session: AsyncSession) -> UserOutDto:
-    query = select(UserModel).where(UserModel.id == user_id)
-    result = await session.execute(query)
-    user = result.scalar_one_or_none()
+    user = await get_user_out(session, user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-    return UserOutDto.new(user)
+    return user
 
 
 async def change_user_field(
-    dto: UserChangeFieldInDto, user: UserModel, session: AsyncSession
+    dto: UserChangeFieldInDto, user: UserOutDto, session: AsyncSession
 ) -> UserOutDto:
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
@@ -199,6 +307,7 @@ async def change_user_field(
         raise HTTPException(status_code=403, detail="Пользователь деактивирован")
 
     try:
+        values = {}
         match dto.field:
             case UserField.NICKNAME:
                 if len(dto.text) < 3:
@@ -213,31 +322,16 @@ async def change_user_field(
                         detail="Никнейм не должен превышать 30 символов",
                     )
 
-                if not re.fullmatch(r"[A-Za-zА-Яа-яёЁ\s\-]+", dto.text):
+                if not NICKNAME_REGEX.fullmatch(dto.text):
                     raise HTTPException(
                         status_code=400,
                         detail="Никнейм должно содержать только буквы, пробелы и дефисы.",
                     )
 
-                query = select(UserModel).where(UserModel.nickname == dto.text)
-                result = await session.execute(query)
-                existing_user = result.scalar_one_or_none()
-                if not existing_user:
-                    user.nickname = dto.text
-                else:
-                    raise HTTPException(
-                        status_code=400, detail="Такой никнейм уже занят"
-                    )
+                # Занятость никнейма проверяет ограничение уникальности при UPDATE
+                values["nickname"] = dto.text
 
             case UserField.LOGIN:
-                query = select(exists().where(UserModel.login == dto.text))
-                result = await session.execute(query)
-                if result.scalar():
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Логин уже существует. Пожалуйста, выберите другой.",
-                    )
-
                 if len(dto.text) < 6:
                     raise HTTPException(
                         status_code=400,
@@ -250,7 +344,7 @@ async def change_user_field(
                         detail="Логин не должен превышать 60 символов",
                     )
 
-                user.login = dto.text
+                values["login"] = dto.text
 
             case UserField.BIO:
                 if len(dto.text) > 500:
@@ -266,7 +360,7 @@ async def change_user_field(
                             detail=f"Био содержит запрещенное слово: '{word}'",
                         )
 
-                user.bio = dto.text
+                values["bio"] = dto.text
 
             case UserField.PASSWORD:
                 if len(dto.text) < 4:
@@ -282,17 +376,49 @@ async def change_user_field(
                     )
 
                 # можно добавить доп проверки на наличие спец символов, заглавных букв и цифр
-                if user.verify_password(dto.text):
+                query = select(UserModel.hashed_password).where(UserModel.id == user.id)
+                result = await session.execute(query)
+                hashed_password = result.scalar_one_or_none()
+                if hashed_password is None:
+                    raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+                if await password_hasher.verify(dto.text, hashed_password):
                     raise HTTPException(
                         status_code=400,
                         detail="Новый пароль совпадает с текущим",
                     )
 
-                user.set_password(dto.text)
+                values["hashed_password"] = await password_hasher.hash(dto.text)
+
+        updated_user = await update_user(
+            session, user.id, UserModel.is_active.is_(True), **values
+        )
+        if not updated_user:
+            raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+        # Смена пароля завершает все сессии пользователя, включая текущую
+        revocation = None
+        if dto.field == UserField.PASSWORD:
+            revocation = revocation_store.revoke_user(session, user.id)
 
         await session.commit()
-        await session.refresh(user)
-        return UserOutDto.new(user)
+        user_cache.invalidate(user.id)
+        if revocation is not None:
+            revocation_store.remember(revocation)
+        return updated_user
+
+    except HTTPException:
+        await session.rollback()
+        raise
+
+    except IntegrityError:
+        await session.rollback()
+        if dto.field == UserField.NICKNAME:
+            raise HTTPException(status_code=400, detail="Такой никнейм уже занят")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Логин уже существует. Пожалуйста, выберите другой.",
+        )
 
     except Exception as e:
         await session.rollback()
@@ -0,0 +1,136 @@
+from contextvars import ContextVar
+from typing import Callable, Optional, TypeVar, Union
+import logging
+import time
+
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = logging.getLogger(__name__)
+
+Endpoint = TypeVar("Endpoint", bound=Callable)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Эндпоинт выполнил больше запросов, чем объявлено в query_budget"""
+
+
+class RequestSqlStats:
+    """Запросы к бд, выполненные в рамках одного HTTP-запроса"""
+
+    __slots__ = ("scope", "queries", "duration")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.queries = 0
+        self.duration = 0.0
+
+    @property
+    def route(self) -> str:
+        route = getattr(self.scope.get("route"), "path", None) or self.scope.get("path")
+        return f"{self.scope.get('method')} {route}"
+
+
+_request_sql_stats: ContextVar[Optional[RequestSqlStats]] = ContextVar(
+    "request_sql_stats", default=None
+)
+
+
+def current_sql_stats() -> Optional[RequestSqlStats]:
+    return _request_sql_stats.get()
+
+
+def query_budget(max_queries: int) -> Callable[[Endpoint], Endpoint]:
+    """
+    Объявление максимального числа запросов к бд для эндпоинта.
+    Ставится под декоратором роутера:
+
+        @router.get("/path")
+        @query_budget(1)
+        async def endpoint(...): ...
+    """
+
+    def decorator(endpoint: Endpoint) -> Endpoint:
+        endpoint.query_budget = max_queries
+        return endpoint
+
+    return decorator
+
+
+def instrument_sql_accounting(engine: Union[AsyncEngine, Engine], slow_query_ms: float) -> None:
+    """Учет запросов текущего HTTP-запроса и журнал медленных запросов"""
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._accounting_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_accounting_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+
+        stats = _request_sql_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.duration += elapsed
+
+        if slow_query_ms > 0 and elapsed * 1000 >= slow_query_ms:
+            route = stats.route if stats is not None else "background"
+            logger.warning(
+                f"Slow query {elapsed * 1000:.1f} ms [{route}]: {' '.join(statement.split())[:1000]}"
+            )
+
+
+class SqlAccountingMiddleware:
+    """
+    Количество запросов и время бд на HTTP-запрос: заголовок Server-Timing
+    и проверка query_budget эндпоинта. В строгом режиме превышение бюджета
+    поднимает QueryBudgetExceeded, чтобы тесты падали
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True, strict_budget: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+        self.strict_budget = strict_budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSqlStats(scope)
+        token = _request_sql_stats.set(stats)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.server_timing:
+                timing = (
+                    f'db;dur={stats.duration * 1000:.1f};desc="{stats.queries} queries"'
+                )
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (b"server-timing", timing.encode())],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_sql_stats.reset(token)
+
+        self._check_budget(stats)
+
+    def _check_budget(self, stats: RequestSqlStats) -> None:
+        endpoint = getattr(stats.scope.get("route"), "endpoint", None)
+        budget = getattr(endpoint, "query_budget", None)
+        if budget is None or stats.queries <= budget:
+            return
+
+        message = f"Query budget exceeded [{stats.route}]: {stats.queries} queries, budget {budget}"
+        if self.strict_budget:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
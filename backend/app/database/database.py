@@ -1,21 +1,35 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase, ORMExecuteState, Session
 from sqlalchemy import event, text
+from fastapi import Depends
 from app.config import settings
-from typing import AsyncGenerator
+from app.services.metrics import TimedQueuePool
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncGenerator, AsyncIterator
 import logging
 
 
 logger = logging.getLogger(__name__)
 
+# Размер пула одного процесса: при общем бюджете соединений он зависит от числа воркеров
+POOL_SIZE, MAX_OVERFLOW = settings.DATABASE_POOL_LIMITS
+
 # асинхронный движок для бд
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=getattr(settings, "DATABASE_ECHO", False),
-    pool_size=getattr(settings, "DATABASE_POOL_SIZE", 20),
-    max_overflow=getattr(settings, "DATABASE_MAX_OVERFLOW", 40),
-    pool_pre_ping=getattr(settings, "DATABASE_POOL_PRE_PING", True),
+    echo=settings.DATABASE_ECHO,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+    pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
     connect_args={"server_settings": {"jit": "off", "application_name": "fastapi_app"}},
+    # Пул с замером ожидания соединения для /metrics
+    **({"poolclass": TimedQueuePool} if settings.METRICS_ENABLED else {}),
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -26,6 +40,37 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+# Движок реплики для читающих эндпоинтов. Без реплики чтение идет в основную бд.
+# Бюджет соединений считается на сервер: реплика обычно отдельный сервер
+replica_engine = (
+    create_async_engine(
+        settings.DATABASE_REPLICA_URL,
+        echo=settings.DATABASE_ECHO,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        connect_args={
+            "server_settings": {
+                "jit": "off",
+                "application_name": "fastapi_app_replica",
+                "default_transaction_read_only": "on",
+            }
+        },
+        **({"poolclass": TimedQueuePool} if settings.METRICS_ENABLED else {}),
+    )
+    if settings.DATABASE_REPLICA_URL
+    else None
+)
+
+ReplicaSessionLocal = async_sessionmaker(
+    replica_engine or engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
 
 # Базовый класс для моделей
 class BaseModel(DeclarativeBase):
@@ -53,19 +98,77 @@ async def create_enums():
         logger.info("Database ENUM types created successfully")
 
 
+# Признак незакоммиченных изменений, сделанных запросами (UPDATE/INSERT/DELETE
+# через session.execute не попадают в session.dirty)
+PENDING_WRITES = "pending_writes"
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_writes(orm_execute_state: ORMExecuteState) -> None:
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[PENDING_WRITES] = True
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _reset_writes(session: Session) -> None:
+    session.info.pop(PENDING_WRITES, None)
+
+
+def has_pending_writes(session: AsyncSession) -> bool:
+    return bool(
+        session.new
+        or session.dirty
+        or session.deleted
+        or session.info.get(PENDING_WRITES)
+    )
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Зависимость для получения сессии базы данных
+    Зависимость для получения сессии базы данных.
+    Соединение берется из пула только при первом запросе к бд, commit
+    выполняется только если остались незакоммиченные изменения
     """
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
+    session = AsyncSessionLocal()
+    try:
+        yield session
+        if has_pending_writes(session):
             await session.commit()
-        except Exception:
-            await session.rollback()
-            raise
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+# Сессия эндпоинта. scope="function" закрывает ее сразу после выхода из эндпоинта,
+# соединение возвращается в пул до сериализации ответа
+DbSession = Annotated[AsyncSession, Depends(get_db, scope="function")]
+
+
+# Ключ advisory lock для инициализации при старте
+STARTUP_LOCK_KEY = 7208_0001
+
+
+@asynccontextmanager
+async def startup_lock() -> AsyncIterator[AsyncConnection]:
+    """
+    Инициализация схемы и данных по очереди: воркеры запускаются одновременно,
+    и параллельные create_all и вставка пользователей по умолчанию конфликтуют.
+    Инициализация выполняется на соединении с блокировкой: при бюджете
+    в одно соединение на воркер второе соединение из пула не дождаться
+    """
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": STARTUP_LOCK_KEY})
+        await conn.commit()
+        try:
+            yield conn
         finally:
-            await session.close()
+            await conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": STARTUP_LOCK_KEY}
+            )
+            await conn.commit()
 
 
 async def init_db():
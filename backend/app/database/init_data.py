@@ -1,9 +1,11 @@
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 from sqlalchemy import select
+from typing import Optional
+import asyncio
 import logging
-from passlib.hash import bcrypt
 
 from app.models.user import UserRole, UserModel
+from app.services.passwords import password_hasher
 from .database import AsyncSessionLocal
 
 
@@ -67,22 +69,31 @@ async def create_default_users(session: AsyncSession):
         ]
 
         created_count = 0
-        skipped_count = 0
 
-        for user_data in default_users:
-            # Проверяем, существует ли уже пользователь с таким логином
-            existing_user = await session.execute(
-                select(UserModel).where(UserModel.login == user_data["login"])
+        # Одним запросом получаем уже существующих пользователей
+        result = await session.execute(
+            select(UserModel.login).where(
+                UserModel.login.in_([user_data["login"] for user_data in default_users])
             )
-            existing_user = existing_user.scalar_one_or_none()
+        )
+        existing_logins = set(result.scalars().all())
+
+        for login in existing_logins:
+            logger.info(f"Пользователь {login} уже существует, пропускаем")
+        skipped_count = len(existing_logins)
+
+        users_to_create = [
+            user_data
+            for user_data in default_users
+            if user_data["login"] not in existing_logins
+        ]
 
-            if existing_user:
-                logger.info(
-                    f"Пользователь {user_data['login']} уже существует, пропускаем"
-                )
-                skipped_count += 1
-                continue
+        # Хешируем пароли параллельно в пуле процессов по текущей политике
+        hashed_passwords = await asyncio.gather(
+            *(password_hasher.hash(user_data["password"]) for user_data in users_to_create)
+        )
 
+        for user_data, hashed_password in zip(users_to_create, hashed_passwords):
             # Создаем нового пользователя
             new_user = UserModel(
                 login=user_data["login"],
@@ -92,11 +103,9 @@ async def create_default_users(session: AsyncSession):
                 is_active=user_data["is_active"],
                 is_email_verified=user_data["is_email_verified"],
                 bio=user_data.get("bio"),
+                hashed_password=hashed_password,
             )
 
-            # Устанавливаем пароль
-            new_user.hashed_password = bcrypt.hash(user_data["password"])
-
             # Добавляем в сессию
             session.add(new_user)
             created_count += 1
@@ -123,8 +132,9 @@ async def create_default_users(session: AsyncSession):
         raise
 
 
-async def initialize_default_data():
-    async with AsyncSessionLocal() as session:
+async def initialize_default_data(connection: Optional[AsyncConnection] = None):
+    """connection - выполнить на уже занятом соединении, не беря второе из пула"""
+    async with AsyncSessionLocal(bind=connection) if connection else AsyncSessionLocal() as session:
         try:
             # Создаем пользователей
             users_result = await create_default_users(session)
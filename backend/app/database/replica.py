@@ -0,0 +1,91 @@
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Annotated, AsyncGenerator
+import time
+
+from app.database.database import (
+    AsyncSessionLocal,
+    DbSession,
+    ReplicaSessionLocal,
+    replica_engine,
+)
+
+
+# Кука с моментом (unix time), до которого клиент читает из основной бд
+PRIMARY_PIN_COOKIE = "db_primary_until"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def is_pinned_to_primary(request: Request) -> bool:
+    value = request.cookies.get(PRIMARY_PIN_COOKIE)
+    if not value:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для читающих эндпоинтов: реплика, либо основная бд,
+    если клиент недавно что-то изменял. Изменения через нее не коммитятся
+    """
+    if replica_engine is not None and not is_pinned_to_primary(request):
+        session = ReplicaSessionLocal()
+    else:
+        session = AsyncSessionLocal()
+
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+# Без реплики читающие эндпоинты берут ту же сессию, что и остальные зависимости
+# запроса (например, аутентификация): FastAPI создает ее один раз, и запрос
+# не держит два соединения из одного пула
+DbReadSession = (
+    Annotated[AsyncSession, Depends(get_read_db, scope="function")]
+    if replica_engine is not None
+    else DbSession
+)
+
+
+class ReadYourWritesMiddleware:
+    """
+    После успешного изменяющего запроса выставляет куку, по которой
+    читающие эндпоинты READ_YOUR_WRITES_SECONDS секунд идут в основную бд
+    и не видят отставания реплики
+    """
+
+    def __init__(self, app: ASGIApp, window_seconds: int):
+        self.app = app
+        self.window_seconds = window_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] in SAFE_METHODS
+            or self.window_seconds <= 0
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = int(time.time()) + self.window_seconds
+                cookie = (
+                    f"{PRIMARY_PIN_COOKIE}={until}; Max-Age={self.window_seconds}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())],
+                }
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
+
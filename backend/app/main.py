@@ -1,13 +1,33 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 import logging
 import uvicorn
 
 from app.config import settings
 from app.views import api_router
-from app.database.database import engine, BaseModel, check_db_connection
+from app.views.responses import FastJSONResponse
+from app.database.database import (
+    MAX_OVERFLOW,
+    POOL_SIZE,
+    BaseModel,
+    check_db_connection,
+    engine,
+    replica_engine,
+    startup_lock,
+)
+from app.database.replica import ReadYourWritesMiddleware
+from app.database.accounting import SqlAccountingMiddleware, instrument_sql_accounting
 from app.database.init_data import initialize_default_data
+from app.services.passwords import password_hasher
+from app.services.user_cache import user_cache
+from app.services.token_cache import token_cache
+from app.services.last_login import last_login_buffer
+from app.services.revocations import revocation_store
+from app.services.rate_limit import auth_limiter
+from app.services.health import health_monitor
+from app.services.metrics import MetricsMiddleware, instrument_engine, render_metrics
 
 # Настройка логирования
 logging.basicConfig(
@@ -33,16 +53,36 @@ async def lifespan(app: FastAPI):
 
     logger.info("Application startup completed successfully")
 
-    logger.info("Creating database tables...")
-    async with engine.begin() as conn:
+    logger.info(
+        f"Database pool per worker: pool_size={POOL_SIZE}, max_overflow={MAX_OVERFLOW}, "
+        f"workers={settings.WEB_CONCURRENCY}"
+    )
+    if 0 < settings.DATABASE_MAX_CONNECTIONS < settings.WEB_CONCURRENCY:
+        logger.warning(
+            "DATABASE_MAX_CONNECTIONS is lower than WEB_CONCURRENCY: "
+            "every worker still needs a connection, the budget will be exceeded"
+        )
+
+    if settings.PASSWORD_HASH_TARGET_MS > 0:
+        await password_hasher.calibrate(settings.PASSWORD_HASH_TARGET_MS)
+    password_hasher.start()
+
+    async with startup_lock() as conn:
+        logger.info("Creating database tables...")
         await conn.run_sync(BaseModel.metadata.create_all)
+        await conn.commit()
 
-    logger.info("Initializing default data...")
-    init_result = await initialize_default_data()
-    if init_result["success"]:
-        logger.info(f"Default data initialized successfully: {init_result}")
-    else:
-        logger.warning(f"Default data initialization failed: {init_result}")
+        logger.info("Initializing default data...")
+        init_result = await initialize_default_data(conn)
+        if init_result["success"]:
+            logger.info(f"Default data initialized successfully: {init_result}")
+        else:
+            logger.warning(f"Default data initialization failed: {init_result}")
+
+    last_login_buffer.start()
+    user_cache.start()
+    await revocation_store.start()
+    await health_monitor.start()
 
     logger.info("Application startup completed successfully")
 
@@ -50,7 +90,14 @@ async def lifespan(app: FastAPI):
 
     # При остановке приложения
     logger.info("Shutting down application...")
+    await health_monitor.stop()
+    await revocation_store.stop()
+    await user_cache.stop()
+    await last_login_buffer.stop()
+    password_hasher.shutdown()
     await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
 
 app = FastAPI(
@@ -61,6 +108,9 @@ app = FastAPI(
     redoc_url="/api/redoc" if settings.DEBUG else None,
     openapi_url="/api/openapi.json" if settings.DEBUG else None,
     lifespan=lifespan,
+    default_response_class=(
+        FastJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse
+    ),
 )
 
 # Настройка CORS
@@ -72,18 +122,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Чтение из реплики: после изменений клиент временно читает из основной бд
+if replica_engine is not None:
+    app.add_middleware(
+        ReadYourWritesMiddleware, window_seconds=settings.READ_YOUR_WRITES_SECONDS
+    )
+
+
+# Учет запросов к бд на HTTP-запрос
+app.add_middleware(
+    SqlAccountingMiddleware,
+    server_timing=settings.SERVER_TIMING_ENABLED,
+    strict_budget=settings.SQL_QUERY_BUDGET_STRICT,
+)
+instrument_sql_accounting(engine, settings.SQL_SLOW_QUERY_MS)
+if replica_engine is not None:
+    instrument_sql_accounting(replica_engine, settings.SQL_SLOW_QUERY_MS)
+
+# Метрики: задержки запросов, пул соединений, время запросов к бд
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, "primary")
+    if replica_engine is not None:
+        instrument_engine(replica_engine, "replica")
+
 
 # Подключение роутеров
 app.include_router(api_router)
 
 
-# Health check endpoint с проверкой БД
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Метрики в текстовом формате Prometheus
+    """
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+# Health check endpoints. В бд не ходят: статус бд поддерживает health_monitor
+@app.get("/health/live")
+async def liveness_check():
+    """
+    Liveness-проба: процесс жив и обрабатывает запросы, без обращения к бд
+    """
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness-проба по последней фоновой проверке бд
+    """
+    status = health_monitor.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 @app.get("/health")
 async def health_check():
     """
     Проверка здоровья приложения
     """
-    db_status = "connected" if await check_db_connection() else "disconnected"
+    db_status = "connected" if health_monitor.ready else "disconnected"
 
     return {
         "status": "healthy",
@@ -91,6 +192,12 @@ async def health_check():
         "version": settings.VERSION,
         "environment": settings.ENVIRONMENT,
         "database": db_status,
+        "database_monitor": health_monitor.status(),
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "last_login_buffer": last_login_buffer.stats(),
+        "revocations": revocation_store.stats(),
+        "auth_limiter": auth_limiter.stats(),
         "api_docs": f"{settings.DOMAIN_URL}:{settings.PORT}/api/docs",
     }
 
@@ -114,10 +221,27 @@ async def root():
 
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG,
-        log_level="info",
-    )
+    if settings.DEBUG:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=True,
+            log_level="info",
+        )
+    else:
+        # Production: несколько процессов, uvloop и httptools, без access-лога
+        # (задержки и статусы есть в /metrics). Адрес клиента - из заголовков
+        # прокси, перечисленных в FORWARDED_ALLOW_IPS
+        uvicorn.run(
+            "app.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=settings.WEB_CONCURRENCY,
+            loop="uvloop",
+            http="httptools",
+            proxy_headers=True,
+            forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+            access_log=False,
+            log_level="info",
+        )
@@ -1,3 +1,4 @@
 from .user import UserModel, UserRole
+from .revoked_token import RevokedTokenModel
 
-__all__ = ["UserModel", "UserRole"]
+__all__ = ["UserModel", "UserRole", "RevokedTokenModel"]
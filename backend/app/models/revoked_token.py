@@ -0,0 +1,38 @@
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database.database import BaseModel
+from datetime import datetime
+from typing import Optional
+
+
+class RevokedTokenModel(BaseModel):
+    """
+    Отзыв сессий. Запись отзывает либо одну сессию (session_id = jti
+    refresh-токена), либо все токены пользователя, выданные не позже
+    revoked_before. После expires_at запись не нужна и удаляется
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+
+    session_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
+    user_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True
+    )
+
+    revoked_before: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<RevokedToken(id={self.id}, session_id='{self.session_id}', user_id={self.user_id})>"
@@ -1,11 +1,11 @@
-from sqlalchemy import String, Boolean, DateTime, Text, func, Integer
+from sqlalchemy import String, Boolean, DateTime, Text, func, Integer, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import ENUM
 from app.database.database import BaseModel
 from datetime import datetime
 from typing import Optional
 import enum
-from passlib.hash import bcrypt
+from app.services.passwords import password_hasher
 
 
 class UserRole(str, enum.Enum):
@@ -18,6 +18,13 @@ class UserRole(str, enum.Enum):
 
 class UserModel(BaseModel):
     __tablename__ = "users"
+    # Составные индексы под keyset-пагинацию по id с фильтрами
+    __table_args__ = (
+        Index("ix_users_role_id", "role", "id"),
+        Index("ix_users_is_active_id", "is_active", "id"),
+        Index("ix_users_is_email_verified_id", "is_email_verified", "id"),
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     id: Mapped[str] = mapped_column(
         Integer,
@@ -88,14 +95,10 @@ class UserModel(BaseModel):
         """Отображаемое имя пользователя"""
         return self.nickname
 
-    def set_password(self, password: str):
+    async def set_password(self, password: str):
         """Установить хешированный пароль"""
-        self.hashed_password = bcrypt.hash(password)
+        self.hashed_password = await password_hasher.hash(password)
 
-    def verify_password(self, password: str) -> bool:
+    async def verify_password(self, password: str) -> bool:
         """Проверка пароля"""
-        try:
-            result = bcrypt.verify(password, self.hashed_password)
-            return result
-        except Exception as e:
-            return False
+        return await password_hasher.verify(password, self.hashed_password)
@@ -0,0 +1,23 @@
+from .user import (
+    USER_OUT_COLUMNS,
+    id_in,
+    select_users_out,
+    get_user_out,
+    get_users_out,
+    insert_user,
+    update_user,
+    update_users,
+    delete_user,
+)
+
+__all__ = [
+    "USER_OUT_COLUMNS",
+    "id_in",
+    "select_users_out",
+    "get_user_out",
+    "get_users_out",
+    "insert_user",
+    "update_user",
+    "update_users",
+    "delete_user",
+]
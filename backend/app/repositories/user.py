@@ -0,0 +1,108 @@
+from typing import Optional
+
+from sqlalchemy import Integer, select, update, delete, any_, bindparam, Select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import UserModel
+from app.schemas.user import UserOutDto
+
+
+# Колонки UserOutDto: без hashed_password и без загрузки сущностей в identity map
+USER_OUT_COLUMNS = (
+    UserModel.id,
+    UserModel.nickname,
+    UserModel.login,
+    UserModel.role,
+    UserModel.bio,
+    UserModel.last_login,
+    UserModel.email,
+    UserModel.is_active,
+    UserModel.is_email_verified,
+    UserModel.created_at,
+    UserModel.updated_at,
+)
+
+
+def id_in(user_ids: list[int]):
+    """id = ANY(:user_ids): один параметр-массив вместо тысяч параметров IN"""
+    return UserModel.id == any_(bindparam("user_ids", user_ids, type_=ARRAY(Integer)))
+
+
+def select_users_out() -> Select:
+    return select(*USER_OUT_COLUMNS)
+
+
+async def get_user_out(session: AsyncSession, user_id: int) -> Optional[UserOutDto]:
+    result = await session.execute(
+        select_users_out().where(UserModel.id == user_id)
+    )
+    row = result.one_or_none()
+    return UserOutDto.from_row(row) if row is not None else None
+
+
+async def get_users_out(session: AsyncSession, query: Select) -> list[UserOutDto]:
+    result = await session.execute(query)
+    return [UserOutDto.from_row(row) for row in result]
+
+
+async def insert_user(session: AsyncSession, **values) -> Optional[UserOutDto]:
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING за один запрос.
+    None - нарушено одно из ограничений уникальности
+    """
+    result = await session.execute(
+        insert(UserModel)
+        .values(**values)
+        .on_conflict_do_nothing()
+        .returning(*USER_OUT_COLUMNS)
+    )
+    row = result.one_or_none()
+    return UserOutDto.from_row(row) if row is not None else None
+
+
+async def update_user(
+    session: AsyncSession, user_id: int, *conditions, **values
+) -> Optional[UserOutDto]:
+    """
+    UPDATE ... WHERE id = :user_id AND <conditions> RETURNING за один запрос.
+    None - строки нет или не выполнены условия
+    """
+    result = await session.execute(
+        update(UserModel)
+        .where(UserModel.id == user_id, *conditions)
+        .values(**values)
+        .returning(*USER_OUT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    return UserOutDto.from_row(row) if row is not None else None
+
+
+async def update_users(
+    session: AsyncSession, user_ids: list[int], *conditions, **values
+) -> list[int]:
+    """
+    Множественный UPDATE ... WHERE id = ANY(:user_ids) AND <conditions> RETURNING id.
+    Возвращает id фактически измененных строк
+    """
+    result = await session.execute(
+        update(UserModel)
+        .where(id_in(user_ids), *conditions)
+        .values(**values)
+        .returning(UserModel.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.scalars().all())
+
+
+async def delete_user(session: AsyncSession, user_id: int) -> bool:
+    """DELETE ... RETURNING id за один запрос. False - пользователя нет"""
+    result = await session.execute(
+        delete(UserModel)
+        .where(UserModel.id == user_id)
+        .returning(UserModel.id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none() is not None
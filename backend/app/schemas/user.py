@@ -1,4 +1,4 @@
-from pydantic import BaseModel, StringConstraints
+from pydantic import BaseModel, Field, StringConstraints
 from typing import Annotated, Optional
 from datetime import datetime
 from app.models.user import UserModel, UserRole
@@ -36,6 +36,67 @@ class UserOutDto(BaseModel):
             updated_at=user.updated_at,
         )
 
+    @staticmethod
+    def from_row(row):
+        """DTO из строки с колонками UserOutDto, поля уже проверены бд"""
+        data = row._asdict()
+        data["role"] = data["role"].value
+        return UserOutDto.model_construct(**data)
+
+
+class UserPageDto(BaseModel):
+    items: list[UserOutDto]
+    next_cursor: Optional[str] = None
+
+
+class UserFilterDto(BaseModel):
+    role: Optional[UserRole] = None
+    is_active: Optional[bool] = None
+    is_email_verified: Optional[bool] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+
+class UserPageQueryDto(UserFilterDto):
+    limit: Annotated[int, Field(ge=1, le=500)] = 50
+    cursor: Optional[str] = None
+
+
+class UsersFileFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class UserExportQueryDto(UserFilterDto):
+    format: UsersFileFormat = UsersFileFormat.NDJSON
+    gzip: bool = False
+
+
+class ImportRowStatus(str, enum.Enum):
+    CONFLICT = "conflict"
+    INVALID = "invalid"
+
+
+class UserImportRowDto(BaseModel):
+    line: int
+    status: ImportRowStatus
+    detail: str
+
+
+class UserImportReportDto(BaseModel):
+    created: int = 0
+    conflicts: int = 0
+    invalid: int = 0
+    errors: list[UserImportRowDto] = []
+
+
+class UserClaimsDto(BaseModel):
+    """Пользователь, восстановленный только из claims access-токена"""
+
+    id: int
+    login: str
+    role: UserRole
+
 
 class UserInDto(BaseModel):
     nickname: Annotated[str, StringConstraints(min_length=2, max_length=30)]
@@ -59,6 +120,38 @@ class ChangeUserActivityInDto(BaseModel):
     user_id: int
 
 
+BULK_CHANGE_MAX_USERS = 10000
+
+
+class UserInBulkChangeRoleDto(BaseModel):
+    role: UserRole
+    user_ids: list[int] = Field(min_length=1, max_length=BULK_CHANGE_MAX_USERS)
+
+
+class BulkChangeUserActivityInDto(BaseModel):
+    activity_flag: bool
+    user_ids: list[int] = Field(min_length=1, max_length=BULK_CHANGE_MAX_USERS)
+
+
+class BulkChangeStatus(str, enum.Enum):
+    UPDATED = "updated"
+    UNCHANGED = "unchanged"
+    NOT_FOUND = "not_found"
+    SELF = "self"
+    FORBIDDEN = "forbidden"
+
+
+class UserBulkChangeResultDto(BaseModel):
+    user_id: int
+    status: BulkChangeStatus
+    detail: Optional[str] = None
+
+
+class UserBulkChangeReportDto(BaseModel):
+    updated: int = 0
+    results: list[UserBulkChangeResultDto] = []
+
+
 class UserField(str, enum.Enum):
     NICKNAME = "nickname"
     LOGIN = "login"
@@ -0,0 +1,162 @@
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.database.database import engine, replica_engine
+
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseProbe:
+    """Результаты проверок одного движка: задержка SELECT 1 и заполненность пула"""
+
+    def __init__(self, name: str, engine: AsyncEngine, window: int):
+        self.name = name
+        self.engine = engine
+        self.latencies_ms: deque[float] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+
+    async def check(self, timeout_seconds: float) -> bool:
+        started = time.perf_counter()
+        try:
+            # Время ожидания соединения из пула входит в задержку: под нагрузкой
+            # это и есть та задержка, которую видят запросы
+            async with asyncio.timeout(timeout_seconds):
+                async with self.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+        except Exception as e:
+            self.consecutive_failures += 1
+            self.last_error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            return False
+
+        self.latencies_ms.append((time.perf_counter() - started) * 1000)
+        self.consecutive_failures = 0
+        self.last_error = None
+        return True
+
+    def pool_stats(self) -> dict:
+        pool = self.engine.pool
+        if not hasattr(pool, "checkedout"):
+            return {}
+
+        size = pool.size()
+        capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+        checked_out = pool.checkedout()
+        return {
+            "size": size,
+            "checked_out": checked_out,
+            "overflow": max(pool.overflow(), 0),
+            "capacity": capacity,
+            "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+        }
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies_ms)
+        return {
+            "reachable": self.consecutive_failures == 0 and bool(latencies),
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "latency_ms": {
+                "last": round(self.latencies_ms[-1], 2) if latencies else None,
+                "p50": round(latencies[len(latencies) // 2], 2) if latencies else None,
+                "max": round(latencies[-1], 2) if latencies else None,
+            },
+            "pool": self.pool_stats(),
+        }
+
+
+class HealthMonitor:
+    """
+    Фоновая проверка бд для readiness-проба. Эндпоинты отдают последний
+    сохраненный статус и сами в бд не ходят, поэтому частые пробы не занимают
+    соединения пула и не зависают, когда бд отвечает медленно.
+    Приложение не готово после failure_threshold неудачных проверок подряд
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 5,
+        timeout_seconds: float = 2,
+        failure_threshold: int = 3,
+        latency_window: int = 60,
+    ):
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.failure_threshold = failure_threshold
+
+        self._probes = [DatabaseProbe("primary", engine, latency_window)]
+        if replica_engine is not None:
+            self._probes.append(DatabaseProbe("replica", replica_engine, latency_window))
+
+        self._checked_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        # Готовность определяет основная бд, без реплики чтение переключать некуда,
+        # но и запись без основной бд невозможна
+        primary = self._probes[0]
+        return (
+            self._checked_at is not None
+            and bool(primary.latencies_ms)
+            and primary.consecutive_failures < self.failure_threshold
+        )
+
+    async def check(self) -> None:
+        await asyncio.gather(
+            *(probe.check(self.timeout_seconds) for probe in self._probes)
+        )
+        self._checked_at = datetime.now(timezone.utc)
+
+        for probe in self._probes:
+            if probe.last_error:
+                logger.warning(
+                    f"Health check failed for {probe.name} database "
+                    f"({probe.consecutive_failures} in a row): {probe.last_error}"
+                )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning(f"Health monitor error: {e}")
+
+    async def start(self) -> None:
+        """Первая проверка и запуск фоновой задачи"""
+        if self._task is None:
+            await self.check()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "checked_at": self._checked_at.isoformat() if self._checked_at else None,
+            "databases": {probe.name: probe.stats() for probe in self._probes},
+        }
+
+
+health_monitor = HealthMonitor(
+    interval_seconds=settings.HEALTH_CHECK_INTERVAL_SECONDS,
+    timeout_seconds=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+    failure_threshold=settings.HEALTH_FAILURE_THRESHOLD,
+)
@@ -0,0 +1,139 @@
+from datetime import datetime
+from typing import Optional
+import asyncio
+import logging
+
+from sqlalchemy import DateTime, Integer, column, or_, update, values
+
+from app.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.user import UserModel
+from app.services.user_cache import user_cache
+
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """
+    Отложенная запись last_login: входы копятся в памяти и сбрасываются
+    одним UPDATE раз в flush_interval_ms или по достижении max_entries
+    """
+
+    def __init__(self, flush_interval_ms: int = 1000, max_entries: int = 500):
+        self.flush_interval_ms = flush_interval_ms
+        self.max_entries = max_entries
+        self._pending: dict[int, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+        self.flushes = 0
+        self.flushed_rows = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def record(self, user_id: int, logged_in_at: datetime) -> None:
+        # Несколько входов одного пользователя в окне схлопываются в самый поздний
+        current = self._pending.get(user_id)
+        if current is None or logged_in_at > current:
+            self._pending[user_id] = logged_in_at
+
+        if len(self._pending) >= self.max_entries:
+            self._wakeup.set()
+
+    def _restore(self, batch: dict[int, datetime]) -> None:
+        for user_id, logged_in_at in batch.items():
+            self.record(user_id, logged_in_at)
+
+    async def flush(self) -> int:
+        """Запись накопленных входов. Возвращает количество пользователей в пакете"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, {}
+            try:
+                await self._write(batch)
+            except BaseException:
+                # Возвращаем пакет в буфер и при отмене задачи во время записи (stop),
+                # чтобы его записал финальный flush. Более свежие входы не перетираются,
+                # повторная запись уже записанного пакета ничего не меняет
+                self._restore(batch)
+                raise
+
+            user_cache.invalidate(*batch)
+            self.flushes += 1
+            self.flushed_rows += len(batch)
+            return len(batch)
+
+    async def _write(self, batch: dict[int, datetime]) -> None:
+        logins = values(
+            column("id", Integer),
+            column("last_login", DateTime(timezone=True)),
+            name="logins",
+        ).data(list(batch.items()))
+
+        query = (
+            update(UserModel)
+            .where(
+                UserModel.id == logins.c.id,
+                # Не откатываем last_login назад, если запись уже новее
+                or_(
+                    UserModel.last_login.is_(None),
+                    UserModel.last_login < logins.c.last_login,
+                ),
+            )
+            .values(last_login=logins.c.last_login)
+            .execution_options(synchronize_session=False)
+        )
+
+        async with AsyncSessionLocal() as session:
+            await session.execute(query)
+            await session.commit()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.flush_interval_ms / 1000
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Не удалось записать last_login: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка фоновой задачи и финальный сброс буфера"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+        }
+
+
+last_login_buffer = LastLoginBuffer(
+    flush_interval_ms=settings.LAST_LOGIN_FLUSH_INTERVAL_MS,
+    max_entries=settings.LAST_LOGIN_FLUSH_MAX_ENTRIES,
+)
@@ -0,0 +1,290 @@
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+import time
+import re
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# Минимальный реестр метрик в текстовом формате Prometheus.
+# Обновление метрики - операция со словарем в event loop, без блокировок
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+HASH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> Iterable[str]:
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """Значение задается вручную или вычисляется при чтении через collect"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        collect: Optional[Callable[[], dict[tuple, float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labels) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def _samples(self) -> Iterable[str]:
+        values = self._collect() if self._collect else self._values
+        for labels, value in list(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [счетчики по корзинам (последняя +Inf), сумма, количество]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def _samples(self) -> Iterable[str]:
+        for labels, (counts, total, count) in list(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# HTTP
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being processed", ("method",)
+)
+
+# База данных
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time by statement type",
+    ("database", "statement"),
+)
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ("database",),
+)
+db_pool_checkouts = Counter(
+    "db_pool_checkouts_total", "Pooled connection checkouts", ("database",)
+)
+
+# Пароли
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds",
+    "Password hashing and verification time including pool queueing",
+    ("operation",),
+    buckets=HASH_BUCKETS,
+)
+
+
+_engines: dict[str, AsyncEngine] = {}
+
+
+def _collect_pool(attribute: str) -> Callable[[], dict[tuple, float]]:
+    def collect() -> dict[tuple, float]:
+        values = {}
+        for name, engine in _engines.items():
+            pool = engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue
+            capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+            if attribute == "checked_out":
+                values[(name,)] = pool.checkedout()
+            elif attribute == "saturation":
+                values[(name,)] = pool.checkedout() / capacity if capacity else 0.0
+            else:
+                values[(name,)] = capacity
+        return values
+
+    return collect
+
+
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out", "Connections currently checked out", ("database",),
+    collect=_collect_pool("checked_out"),
+)
+db_pool_capacity = Gauge(
+    "db_pool_capacity", "pool_size + max_overflow", ("database",),
+    collect=_collect_pool("capacity"),
+)
+db_pool_saturation = Gauge(
+    "db_pool_saturation", "Checked out connections / pool capacity", ("database",),
+    collect=_collect_pool("saturation"),
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, измеряющий ожидание свободного соединения"""
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - started, self.metrics_name)
+
+
+STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY"}
+_FIRST_KEYWORD = re.compile(r"\s*([A-Za-z]+)")
+
+
+def statement_type(statement: str) -> str:
+    match = _FIRST_KEYWORD.match(statement)
+    keyword = match.group(1).upper() if match else ""
+    return keyword if keyword in STATEMENT_TYPES else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """Подписка на события движка: время запросов и выдача соединений из пула"""
+    _engines[name] = engine
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.metrics_name = name
+
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            db_query_duration.observe(
+                time.perf_counter() - started, name, statement_type(statement)
+            )
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        db_pool_checkouts.inc(name)
+
+
+class MetricsMiddleware:
+    """Задержка по шаблону маршрута и количество запросов в обработке"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec(method)
+            # Шаблон маршрута, а не фактический путь - число рядов ограничено
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - started, method, route, status_code
+            )
@@ -0,0 +1,233 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+import multiprocessing
+import asyncio
+import logging
+import time
+import os
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.config import settings
+from app.services.metrics import password_hash_duration
+
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_SCHEMES = ("bcrypt", "argon2")
+
+# Допустимые границы стоимости: bcrypt - log2 раундов, argon2 - time_cost
+COST_LIMITS = {
+    "bcrypt": (4, 31),
+    "argon2": (1, 20),
+}
+
+
+def build_context(scheme: str, cost: int) -> CryptContext:
+    """
+    Контекст passlib для текущей политики. Остальные схемы остаются
+    для проверки старых хешей и помечаются как устаревшие.
+    Устаревшими считаются только хеши дешевле политики: воркеры и хосты калибруют
+    стоимость независимо, и более дорогой хеш не должен перехешироваться вниз
+    """
+    if scheme not in PASSWORD_SCHEMES:
+        raise ValueError(f"Unsupported password hash scheme: {scheme}")
+
+    return CryptContext(
+        schemes=[scheme] + [s for s in PASSWORD_SCHEMES if s != scheme],
+        default=scheme,
+        deprecated="auto",
+        **{
+            f"{scheme}__default_rounds": cost,
+            f"{scheme}__min_rounds": cost,
+        },
+    )
+
+
+def calibrate_cost(scheme: str, target_ms: float) -> int:
+    """
+    Подбор максимальной стоимости хеширования,
+    укладывающейся в target_ms на текущем хосте
+    """
+    min_cost, max_cost = COST_LIMITS[scheme]
+    best = min_cost
+
+    for cost in range(min_cost, max_cost + 1):
+        context = build_context(scheme, cost)
+        started = time.perf_counter()
+        context.hash("calibration-password")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if elapsed_ms > target_ms:
+            break
+        best = cost
+
+    return best
+
+
+# Контекст дочернего процесса, создается в инициализаторе пула
+_context: Optional[CryptContext] = None
+
+
+def _init_worker(scheme: str, cost: int) -> None:
+    global _context
+    _context = build_context(scheme, cost)
+
+
+# Функции выполняются в дочерних процессах, поэтому должны быть на уровне модуля
+def _hash(password: str) -> str:
+    return _context.hash(password)
+
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    return [_context.hash(password) for password in passwords]
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    try:
+        return _context.verify(password, hashed_password)
+    except Exception:
+        return False
+
+
+class PasswordHasher:
+    """
+    Хеширование и проверка паролей в отдельном пуле процессов,
+    чтобы bcrypt/argon2 не блокировали event loop
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 0,
+        queue_size: int = 64,
+        scheme: str = "bcrypt",
+        cost: int = 12,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.configure(scheme, cost)
+
+    @property
+    def capacity(self) -> int:
+        """Сколько задач может одновременно выполняться и ждать в очереди"""
+        return self.max_workers + self.queue_size
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def configure(self, scheme: str, cost: int) -> None:
+        """Смена политики хеширования. Пул пересоздается при следующем запросе"""
+        min_cost, max_cost = COST_LIMITS.get(scheme, (cost, cost))
+        self.scheme = scheme
+        self.cost = max(min_cost, min(cost, max_cost))
+        # Контекст основного процесса нужен только для needs_update - без хеширования
+        self._context = build_context(self.scheme, self.cost)
+        self.shutdown()
+
+    async def calibrate(self, target_ms: float) -> int:
+        """Подбор стоимости под целевую задержку и применение ее к пулу"""
+        cost = await asyncio.to_thread(calibrate_cost, self.scheme, target_ms)
+        self.configure(self.scheme, cost)
+        logger.info(
+            f"Password hashing calibrated: scheme={self.scheme}, cost={cost}, target={target_ms}ms"
+        )
+        return cost
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.scheme, self.cost),
+            )
+            logger.info(
+                f"Password hasher started with {self.max_workers} workers "
+                f"({self.scheme}, cost={self.cost})"
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn: Callable, *args):
+        if self._pending >= self.capacity:
+            raise HTTPException(
+                status_code=503,
+                detail="Сервер перегружен. Повторите попытку позже.",
+                headers={"Retry-After": "1"},
+            )
+
+        self.start()
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(fn, *args))
+        finally:
+            self._pending -= 1
+            password_hash_duration.observe(
+                time.perf_counter() - started, fn.__name__.lstrip("_")
+            )
+
+    async def hash(self, password: str) -> str:
+        """Хеширование пароля"""
+        return await self._run(_hash, password)
+
+    async def hash_many(self, passwords: list[str], chunk_size: int = 8) -> list[str]:
+        """
+        Пакетное хеширование на всех воркерах. Одновременно в пуле не больше
+        max_workers порций, поэтому одиночные запросы (логин, регистрация)
+        ждут не дольше одной небольшой порции
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_workers)
+
+        async def hash_chunk(chunk: list[str]) -> list[str]:
+            async with slots:
+                self._pending += 1
+                started = time.perf_counter()
+                try:
+                    return await loop.run_in_executor(self._executor, _hash_many, chunk)
+                finally:
+                    self._pending -= 1
+                    # Время на один пароль, чтобы не смешивать с одиночными хешами
+                    password_hash_duration.observe(
+                        (time.perf_counter() - started) / len(chunk), "hash_many"
+                    )
+
+        chunks = [
+            passwords[i : i + chunk_size] for i in range(0, len(passwords), chunk_size)
+        ]
+        results = await asyncio.gather(*(hash_chunk(chunk) for chunk in chunks))
+        return [hashed for chunk in results for hashed in chunk]
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Проверка пароля по хешу"""
+        return await self._run(_verify, password, hashed_password)
+
+    def needs_update(self, hashed_password: str) -> bool:
+        """Хеш создан устаревшей схемой или с другой стоимостью"""
+        try:
+            return self._context.needs_update(hashed_password)
+        except Exception:
+            return False
+
+
+password_hasher = PasswordHasher(
+    # По умолчанию ядра делятся между воркерами uvicorn
+    max_workers=(
+        settings.PASSWORD_HASH_WORKERS
+        or max((os.cpu_count() or 1) // max(settings.WEB_CONCURRENCY, 1), 1)
+    ),
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+    scheme=settings.PASSWORD_HASH_SCHEME,
+    cost=settings.PASSWORD_HASH_COST,
+)
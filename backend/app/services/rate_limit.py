@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+import math
+import time
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.passwords import password_hasher
+
+
+class TokenBucket:
+    """
+    Token bucket по ключу: rate_per_minute токенов в минуту, не больше burst.
+    Ключей не больше max_keys, давно не использованные вытесняются
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 100000):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: str) -> Optional[float]:
+        """Списание токена. None - разрешено, иначе через сколько секунд повторить"""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            return (1 - tokens) / self.rate if self.rate > 0 else 60.0
+
+        self._buckets[key] = (tokens - 1, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return None
+
+
+class AuthLimiter:
+    """
+    Защита эндпоинтов с хешированием паролей (вход, регистрация):
+    token bucket по логину и по IP и общий лимит одновременных проверок.
+    Все отказы происходят до хеширования
+    """
+
+    def __init__(
+        self,
+        login_rate: float,
+        login_burst: int,
+        ip_rate: float,
+        ip_burst: int,
+        max_concurrency: int,
+        max_keys: int = 100000,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.max_concurrency = max_concurrency or password_hasher.max_workers * 2
+        self._logins = TokenBucket(login_rate, login_burst, max_keys)
+        self._ips = TokenBucket(ip_rate, ip_burst, max_keys)
+        self._active = 0
+
+        self.allowed = 0
+        self.limited_login = 0
+        self.limited_ip = 0
+        self.rejected_busy = 0
+
+    @staticmethod
+    def _too_many_requests(retry_after: float) -> HTTPException:
+        return HTTPException(
+            status_code=429,
+            detail="Слишком много попыток. Повторите попытку позже.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    @asynccontextmanager
+    async def guard(self, ip: Optional[str], login: Optional[str] = None) -> AsyncIterator[None]:
+        """Слот на одну операцию с паролем для клиента ip и логина login"""
+        if not self.enabled:
+            yield
+            return
+
+        if self._active >= self.max_concurrency:
+            self.rejected_busy += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Сервер перегружен. Повторите попытку позже.",
+                headers={"Retry-After": "1"},
+            )
+
+        if ip is not None:
+            retry_after = self._ips.acquire(ip)
+            if retry_after is not None:
+                self.limited_ip += 1
+                raise self._too_many_requests(retry_after)
+
+        if login is not None:
+            retry_after = self._logins.acquire(login)
+            if retry_after is not None:
+                self.limited_login += 1
+                raise self._too_many_requests(retry_after)
+
+        self.allowed += 1
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "allowed": self.allowed,
+            "limited_login": self.limited_login,
+            "limited_ip": self.limited_ip,
+            "rejected_busy": self.rejected_busy,
+            "tracked_logins": len(self._logins),
+            "tracked_ips": len(self._ips),
+        }
+
+
+auth_limiter = AuthLimiter(
+    login_rate=settings.AUTH_LOGIN_ATTEMPTS_PER_MINUTE,
+    login_burst=settings.AUTH_LOGIN_BURST,
+    ip_rate=settings.AUTH_IP_ATTEMPTS_PER_MINUTE,
+    ip_burst=settings.AUTH_IP_BURST,
+    max_concurrency=settings.AUTH_MAX_CONCURRENT_HASHES,
+    max_keys=settings.AUTH_LIMITER_MAX_KEYS,
+    enabled=settings.AUTH_LIMITER_ENABLED,
+)
@@ -0,0 +1,208 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
+import heapq
+import logging
+import time
+
+from sqlalchemy import delete, select
+
+from app.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.revoked_token import RevokedTokenModel
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+logger = logging.getLogger(__name__)
+
+# Запас при догрузке: транзакции коммитятся не в порядке created_at
+SYNC_OVERLAP_SECONDS = 60
+
+
+class RevocationStore:
+    """
+    Отозванные сессии. Источник истины - таблица revoked_tokens, в памяти
+    процесса хранится ее зеркало из еще не истекших записей, поэтому проверка
+    токена - два поиска в dict без запроса в бд.
+
+    Записи других воркеров догружаются раз в sync_interval_seconds,
+    истекшие записи удаляются из памяти по мере истечения и из бд
+    раз в purge_interval_seconds
+    """
+
+    def __init__(
+        self, sync_interval_seconds: float = 5, purge_interval_seconds: float = 3600
+    ):
+        self.sync_interval_seconds = sync_interval_seconds
+        self.purge_interval_seconds = purge_interval_seconds
+
+        # session_id -> expires_at
+        self._sessions: dict[str, float] = {}
+        # user_id -> (revoked_before, expires_at)
+        self._users: dict[int, tuple[float, float]] = {}
+        # Очередь истечения записей: (expires_at, session_id | user_id)
+        self._expiry: list[tuple[float, str | int]] = []
+
+        self._synced_until: Optional[datetime] = None
+        self._purged_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+        self.syncs = 0
+        self.compacted = 0
+
+    def is_revoked(
+        self, session_id: Optional[str], user_id: Optional[int], issued_at: Optional[float]
+    ) -> bool:
+        if session_id is not None and session_id in self._sessions:
+            return True
+
+        user_revocation = self._users.get(user_id)
+        if user_revocation is not None:
+            # Токен без iat нельзя сравнить с моментом отзыва - считаем отозванным
+            return issued_at is None or issued_at <= user_revocation[0]
+
+        return False
+
+    def revoke_session(
+        self,
+        session: AsyncSession,
+        session_id: str,
+        user_id: Optional[int],
+        expires_at: datetime,
+    ) -> RevokedTokenModel:
+        """Отзыв одной сессии. После коммита запись нужно передать в remember"""
+        revocation = RevokedTokenModel(
+            session_id=session_id, user_id=user_id, expires_at=expires_at
+        )
+        session.add(revocation)
+        return revocation
+
+    def revoke_user(self, session: AsyncSession, user_id: int) -> RevokedTokenModel:
+        """
+        Отзыв всех токенов пользователя, выданных до текущего момента.
+        Запись живет, пока может быть жив самый долгий refresh-токен
+        """
+        now = datetime.now(timezone.utc)
+        revocation = RevokedTokenModel(
+            user_id=user_id,
+            revoked_before=now,
+            expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+        session.add(revocation)
+        return revocation
+
+    def remember(self, revocation: RevokedTokenModel) -> None:
+        """Применение записи к зеркалу в памяти"""
+        expires_at = revocation.expires_at.timestamp()
+        if expires_at <= time.time():
+            return
+
+        if revocation.session_id is not None:
+            self._sessions[revocation.session_id] = max(
+                expires_at, self._sessions.get(revocation.session_id, 0.0)
+            )
+            heapq.heappush(self._expiry, (expires_at, revocation.session_id))
+
+        elif revocation.user_id is not None and revocation.revoked_before is not None:
+            revoked_before = revocation.revoked_before.timestamp()
+            current = self._users.get(revocation.user_id)
+            if current is None or current[0] < revoked_before:
+                self._users[revocation.user_id] = (revoked_before, expires_at)
+                heapq.heappush(self._expiry, (expires_at, revocation.user_id))
+
+    def compact(self) -> int:
+        """Удаление истекших записей из памяти. Возвращает количество удаленных"""
+        now = time.time()
+        removed = 0
+
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            if isinstance(key, str):
+                if self._sessions.get(key) == expires_at:
+                    del self._sessions[key]
+                    removed += 1
+            else:
+                current = self._users.get(key)
+                if current is not None and current[1] == expires_at:
+                    del self._users[key]
+                    removed += 1
+
+        self.compacted += removed
+        return removed
+
+    async def sync(self) -> int:
+        """Догрузка новых записей из бд (при первом вызове - всех действующих)"""
+        query = select(RevokedTokenModel).where(
+            RevokedTokenModel.expires_at > datetime.now(timezone.utc)
+        )
+        if self._synced_until is not None:
+            query = query.where(
+                RevokedTokenModel.created_at
+                > self._synced_until - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+            )
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(query)
+            revocations = result.scalars().all()
+
+        for revocation in revocations:
+            self.remember(revocation)
+            if self._synced_until is None or revocation.created_at > self._synced_until:
+                self._synced_until = revocation.created_at
+
+        if self._synced_until is None:
+            self._synced_until = datetime.now(timezone.utc)
+
+        self.syncs += 1
+        return len(revocations)
+
+    async def purge(self) -> None:
+        """Удаление истекших записей из бд"""
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                delete(RevokedTokenModel).where(
+                    RevokedTokenModel.expires_at <= datetime.now(timezone.utc)
+                )
+            )
+            await session.commit()
+        self._purged_at = time.monotonic()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval_seconds)
+            try:
+                await self.sync()
+                self.compact()
+                if time.monotonic() - self._purged_at >= self.purge_interval_seconds:
+                    await self.purge()
+            except Exception as e:
+                logger.warning(f"Не удалось синхронизировать отозванные токены: {e}")
+
+    async def start(self) -> None:
+        """Начальная загрузка и запуск фоновой синхронизации"""
+        if self._task is None:
+            await self.sync()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "users": len(self._users),
+            "syncs": self.syncs,
+            "compacted": self.compacted,
+        }
+
+
+revocation_store = RevocationStore(
+    sync_interval_seconds=settings.REVOCATION_SYNC_INTERVAL_SECONDS
+)
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import time
+
+from app.config import settings
+
+
+class TokenCache:
+    """
+    LRU кеш проверенных payload JWT. Ключ - sha256 токена, сами токены
+    в памяти не хранятся. Запись живет до exp токена, поэтому истекший
+    токен снова проходит полную проверку и отклоняется.
+    В кеш попадают только успешно проверенные токены
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._items: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Payload проверенного токена. Возвращаемый dict нельзя изменять"""
+        if not self.enabled:
+            return None
+
+        key = self._key(token)
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, payload = item
+        if expires_at <= time.time():
+            del self._items[key]
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def set(self, token: str, payload: dict) -> None:
+        if not self.enabled:
+            return
+
+        # Токены без exp не кешируем: у записи не было бы срока жизни
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+
+        key = self._key(token)
+        self._items[key] = (float(expires_at), payload)
+        self._items.move_to_end(key)
+
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+token_cache = TokenCache(max_size=settings.TOKEN_CACHE_MAX_SIZE)
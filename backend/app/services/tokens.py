@@ -0,0 +1,252 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+import binascii
+import base64
+import hashlib
+import hmac
+import time
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+from jose import jwt, JWTError
+from jose.exceptions import ExpiredSignatureError
+import orjson
+
+from app.config import settings
+
+
+class TokenError(Exception):
+    """Токен невалиден: формат, алгоритм или подпись"""
+
+
+class TokenExpiredError(TokenError):
+    """Истек срок действия токена"""
+
+
+_URLSAFE_TO_STD = bytes.maketrans(b"-_", b"+/")
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(segment: bytes) -> bytes:
+    # Строгое декодирование: посторонние символы не отбрасываются молча
+    segment = segment.translate(_URLSAFE_TO_STD) + b"=" * (-len(segment) % 4)
+    try:
+        return base64.b64decode(segment, validate=True)
+    except binascii.Error:
+        raise TokenError("Некорректный base64 в токене")
+
+
+class TokenCodec(ABC):
+    """Кодирование и проверка JWT. Ошибки проверки - TokenError"""
+
+    algorithm: str
+
+    @abstractmethod
+    def encode(self, payload: dict) -> str: ...
+
+    @abstractmethod
+    def decode(self, token: str) -> dict: ...
+
+
+class CompactJWTCodec(TokenCodec):
+    """
+    Минимальная реализация JWS Compact Serialization: фиксированный заголовок,
+    orjson для payload и проверка exp/nbf. Алгоритм из заголовка сверяется
+    с алгоритмом кодека, подмена алгоритма невозможна
+    """
+
+    def __init__(self):
+        self._header = _b64encode(
+            orjson.dumps({"alg": self.algorithm, "typ": "JWT"})
+        )
+        # Заголовки уже проверенных токенов, чтобы не разбирать JSON каждый раз
+        self._known_headers = {self._header}
+
+    @abstractmethod
+    def _sign(self, signing_input: bytes) -> bytes: ...
+
+    @abstractmethod
+    def _verify(self, signing_input: bytes, signature: bytes) -> bool: ...
+
+    def encode(self, payload: dict) -> str:
+        signing_input = self._header + b"." + _b64encode(orjson.dumps(payload))
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode()
+
+    def _check_header(self, header: bytes) -> None:
+        if header in self._known_headers:
+            return
+
+        try:
+            fields = orjson.loads(_b64decode(header))
+        except orjson.JSONDecodeError:
+            raise TokenError("Некорректный заголовок токена")
+
+        if not isinstance(fields, dict) or fields.get("alg") != self.algorithm:
+            raise TokenError("Неподдерживаемый алгоритм токена")
+
+        if len(self._known_headers) < 16:
+            self._known_headers.add(header)
+
+    def decode(self, token: str) -> dict:
+        try:
+            raw = token.encode("ascii")
+        except UnicodeEncodeError:
+            raise TokenError("Некорректный токен")
+
+        parts = raw.split(b".")
+        if len(parts) != 3:
+            raise TokenError("Некорректный токен")
+        header, payload, signature = parts
+
+        self._check_header(header)
+        if not self._verify(header + b"." + payload, _b64decode(signature)):
+            raise TokenError("Неверная подпись токена")
+
+        try:
+            claims = orjson.loads(_b64decode(payload))
+        except orjson.JSONDecodeError:
+            raise TokenError("Некорректный payload токена")
+        if not isinstance(claims, dict):
+            raise TokenError("Некорректный payload токена")
+
+        now = time.time()
+        exp = claims.get("exp")
+        if exp is not None:
+            if not isinstance(exp, (int, float)):
+                raise TokenError("Некорректное поле exp")
+            if exp <= now:
+                raise TokenExpiredError("Истекло время жизни токена")
+
+        nbf = claims.get("nbf")
+        if isinstance(nbf, (int, float)) and nbf > now:
+            raise TokenError("Токен еще не действителен")
+
+        return claims
+
+
+class HS256Codec(CompactJWTCodec):
+    algorithm = "HS256"
+
+    def __init__(self, secret: str):
+        self._secret = secret.encode()
+        super().__init__()
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        return hmac.new(self._secret, signing_input, hashlib.sha256).digest()
+
+    def _verify(self, signing_input: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(self._sign(signing_input), signature)
+
+
+class AsymmetricCodec(CompactJWTCodec):
+    """
+    EdDSA (Ed25519) или RS256. Для проверки достаточно открытого ключа,
+    поэтому другие сервисы могут проверять токены без обращения к этому.
+    Без закрытого ключа кодек работает только на проверку
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        public_key_pem: bytes,
+        private_key_pem: Optional[bytes] = None,
+    ):
+        if algorithm == "EdDSA":
+            key_types = (ed25519.Ed25519PublicKey, ed25519.Ed25519PrivateKey)
+        elif algorithm == "RS256":
+            key_types = (rsa.RSAPublicKey, rsa.RSAPrivateKey)
+        else:
+            raise ValueError(f"Unsupported asymmetric token algorithm: {algorithm}")
+
+        self.algorithm = algorithm
+        self._public_key = serialization.load_pem_public_key(public_key_pem)
+        self._private_key = (
+            serialization.load_pem_private_key(private_key_pem, password=None)
+            if private_key_pem
+            else None
+        )
+
+        if not isinstance(self._public_key, key_types[0]) or (
+            self._private_key is not None
+            and not isinstance(self._private_key, key_types[1])
+        ):
+            raise ValueError(f"Key type does not match algorithm {algorithm}")
+
+        super().__init__()
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        if self._private_key is None:
+            raise TokenError("Закрытый ключ не задан, кодек работает только на проверку")
+
+        if self.algorithm == "EdDSA":
+            return self._private_key.sign(signing_input)
+        return self._private_key.sign(
+            signing_input, padding.PKCS1v15(), hashes.SHA256()
+        )
+
+    def _verify(self, signing_input: bytes, signature: bytes) -> bool:
+        try:
+            if self.algorithm == "EdDSA":
+                self._public_key.verify(signature, signing_input)
+            else:
+                self._public_key.verify(
+                    signature, signing_input, padding.PKCS1v15(), hashes.SHA256()
+                )
+        except InvalidSignature:
+            return False
+        return True
+
+
+class JoseCodec(TokenCodec):
+    """Прежняя реализация на python-jose, оставлена для сравнения и совместимости"""
+
+    def __init__(self, key, algorithm: str = "HS256"):
+        self.algorithm = algorithm
+        self._key = key
+
+    def encode(self, payload: dict) -> str:
+        return jwt.encode(payload, self._key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return jwt.decode(token, self._key, algorithms=[self.algorithm])
+        except ExpiredSignatureError:
+            raise TokenExpiredError("Истекло время жизни токена")
+        except JWTError as e:
+            raise TokenError(str(e))
+
+
+def _read_key(path: Optional[str]) -> Optional[bytes]:
+    if not path:
+        return None
+    with open(path, "rb") as key_file:
+        return key_file.read()
+
+
+def build_token_codec() -> TokenCodec:
+    """Кодек по настройкам: TOKEN_CODEC (native | jose) и ALGORITHM"""
+    if settings.TOKEN_CODEC == "jose":
+        if settings.ALGORITHM != "HS256":
+            raise ValueError("TOKEN_CODEC=jose supports only HS256")
+        return JoseCodec(settings.JWT_SECRET, settings.ALGORITHM)
+
+    if settings.TOKEN_CODEC != "native":
+        raise ValueError(f"Unsupported token codec: {settings.TOKEN_CODEC}")
+
+    if settings.ALGORITHM == "HS256":
+        return HS256Codec(settings.JWT_SECRET)
+
+    public_key = _read_key(settings.JWT_PUBLIC_KEY_PATH)
+    if public_key is None:
+        raise ValueError(f"JWT_PUBLIC_KEY_PATH is required for {settings.ALGORITHM}")
+
+    return AsymmetricCodec(
+        settings.ALGORITHM, public_key, _read_key(settings.JWT_PRIVATE_KEY_PATH)
+    )
+
+
+token_codec = build_token_codec()
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from typing import Optional
+import asyncio
+import logging
+import time
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.user import UserModel
+from app.schemas.user import UserOutDto
+
+
+logger = logging.getLogger(__name__)
+
+# Размер порции id в одном запросе сверки (лимит параметров asyncpg - 32767)
+SYNC_BATCH_SIZE = 5000
+
+
+class UserCache:
+    """
+    TTL + LRU кеш аутентифицированных пользователей по user_id.
+    Кеш живет внутри процесса, поэтому после изменения пользователя
+    его нужно явно инвалидировать.
+
+    Изменения, сделанные другими воркерами, находятся сверкой раз в
+    sync_interval_seconds: записи, у которых в бд другой updated_at
+    или которых в бд больше нет, удаляются из кеша
+    """
+
+    def __init__(
+        self, max_size: int = 10000, ttl_seconds: float = 30, sync_interval_seconds: float = 1
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.sync_interval_seconds = sync_interval_seconds
+        self._items: OrderedDict[int, tuple[float, UserOutDto]] = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.syncs = 0
+        self.synced_invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, user_id: int) -> Optional[UserOutDto]:
+        item = self._items.get(user_id)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, user = item
+        if expires_at < time.monotonic():
+            del self._items[user_id]
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def set(self, user: UserOutDto) -> None:
+        if not self.enabled:
+            return
+
+        self._items[user.id] = (time.monotonic() + self.ttl_seconds, user)
+        self._items.move_to_end(user.id)
+
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *user_ids: int) -> None:
+        for user_id in user_ids:
+            self._items.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    async def sync(self) -> int:
+        """Удаление записей, измененных или удаленных в бд другими воркерами"""
+        snapshot = dict(self._items)
+        if not snapshot:
+            return 0
+
+        ids = list(snapshot)
+        current: dict[int, object] = {}
+        async with AsyncSessionLocal() as session:
+            for start in range(0, len(ids), SYNC_BATCH_SIZE):
+                result = await session.execute(
+                    select(UserModel.id, UserModel.updated_at).where(
+                        UserModel.id.in_(ids[start : start + SYNC_BATCH_SIZE])
+                    )
+                )
+                current.update(result.tuples().all())
+
+        stale = 0
+        for user_id, item in snapshot.items():
+            # Запись могли обновить, пока шел запрос: тогда она уже свежая
+            if self._items.get(user_id) is not item:
+                continue
+            if current.get(user_id) != item[1].updated_at:
+                del self._items[user_id]
+                stale += 1
+
+        self.syncs += 1
+        self.synced_invalidations += stale
+        return stale
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval_seconds)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"Не удалось сверить кеш пользователей: {e}")
+
+    def start(self) -> None:
+        """Запуск фоновой сверки с бд"""
+        if self._task is None and self.enabled and self.sync_interval_seconds > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "syncs": self.syncs,
+            "synced_invalidations": self.synced_invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+user_cache = UserCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    sync_interval_seconds=settings.USER_CACHE_SYNC_INTERVAL_SECONDS,
+)
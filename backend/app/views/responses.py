@@ -0,0 +1,34 @@
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import Row
+import orjson
+
+from app.config import settings
+
+
+def _default(obj: Any) -> Any:
+    # Поля моделей уже провалидированы при создании DTO, повторно не проверяем
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    if isinstance(obj, Row):
+        return obj._asdict()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(ORJSONResponse):
+    """JSON-ответ на orjson, сериализует готовые DTO и строки бд напрямую"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+
+def fast_response(content: Any) -> Any:
+    """
+    В быстром режиме отдает контент сразу FastJSONResponse, минуя повторную
+    валидацию по response_model. Иначе возвращает контент как есть
+    """
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(content)
+    return content
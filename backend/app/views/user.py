@@ -1,41 +1,77 @@
-from fastapi import APIRouter, Depends, Path, Header, Response, HTTPException
+from fastapi import (
+    APIRouter,
+    Depends,
+    Path,
+    Query,
+    Header,
+    Request,
+    Response,
+    HTTPException,
+)
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated
 
 from app.schemas.user import (
     UserOutDto,
     UserInDto,
     UserInChangeRoleDto,
     ChangeUserActivityInDto,
-    UserChangeFieldInDto
+    UserInBulkChangeRoleDto,
+    BulkChangeUserActivityInDto,
+    UserBulkChangeReportDto,
+    UserChangeFieldInDto,
+    UserPageDto,
+    UserPageQueryDto,
+    UserExportQueryDto,
+    UsersFileFormat,
+    UserImportReportDto,
 )
 from app.controllers import user as user_controller
-from app.database.database import get_db
+from app.controllers.user.authentication import CurrentUser
+from app.database.database import DbSession
+from app.database.replica import DbReadSession
+from app.database.accounting import query_budget
+from app.views.responses import fast_response
+from app.services.rate_limit import auth_limiter
 
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
+def _client_ip(request: Request) -> str | None:
+    # За прокси адрес клиента берется из X-Forwarded-For, только если адрес
+    # прокси указан в FORWARDED_ALLOW_IPS (иначе это адрес самого прокси)
+    return request.client.host if request.client else None
+
+
 @router.post("", response_model=UserOutDto)
-async def create_user(user_in: UserInDto, session: AsyncSession = Depends(get_db)):
+@query_budget(2)
+async def create_user(
+    request: Request, user_in: UserInDto, session: DbSession
+):
     """Создание пользователя"""
-    return await user_controller.create_user(user_in, session)
+    async with auth_limiter.guard(_client_ip(request)):
+        return await user_controller.create_user(user_in, session)
 
 
 @router.delete("/delete", status_code=204)
-async def delete_user(user_id: int, session: AsyncSession = Depends(get_db)):
+@query_budget(1)
+async def delete_user(user_id: int, session: DbSession):
     """Удаление пользователя по user_id"""
     await user_controller.delete_user(user_id, session)
 
 
 @router.post("/login")
+@query_budget(1)
 async def login(
+    request: Request,
     response: Response,
+    session: DbSession,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    session: AsyncSession = Depends(get_db),
 ):
     """Создание токена и установка куки"""
-    tokens = await user_controller.login(response, form_data, session)
+    async with auth_limiter.guard(_client_ip(request), form_data.username):
+        tokens = await user_controller.login(response, form_data, session)
     return {
         "token_type": "bearer",
         "access_token": tokens.access_token,
@@ -45,8 +81,9 @@ async def login(
 
 
 @router.post("/refresh", response_model=str)
+@query_budget(1)
 async def refresh(
-    authorization: str = Header(...), session: AsyncSession = Depends(get_db)
+    session: DbSession, authorization: str = Header(...)
 ):
     """Обновление Access-токена. В заголовке Authorization необходимо указать Refresh-токен"""
     scheme, _, token = authorization.partition(" ")
@@ -55,63 +92,131 @@ async def refresh(
     return await user_controller.refresh(token, session)
 
 
-@router.get("", response_model=list[UserOutDto])
-async def get_users(session: AsyncSession = Depends(get_db)):
-    """Получение всех пользователей"""
-    return await user_controller.get_users(session)
+@router.post("/logout", status_code=204)
+@query_budget(1)
+async def logout(
+    response: Response,
+    session: DbSession,
+    authorization: str = Header(...),
+):
+    """Завершение сессии. В заголовке Authorization необходимо указать Refresh-токен"""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer":
+        raise HTTPException(status_code=401, detail="Неверный формат токена")
+    await user_controller.logout(response, token, session)
+
+
+@router.get("", response_model=UserPageDto)
+@query_budget(1)
+async def get_users(
+    query: Annotated[UserPageQueryDto, Query()],
+    session: DbReadSession,
+):
+    """Получение пользователей постранично. Для следующей страницы передайте next_cursor"""
+    return fast_response(await user_controller.get_users(query, session))
+
+
+@router.get("/export")
+async def export_users(
+    query: Annotated[UserExportQueryDto, Query()],
+    user: CurrentUser,
+):
+    """Потоковая выгрузка пользователей в NDJSON или CSV (только для администраторов)"""
+    return await user_controller.export_users(query, user)
+
+
+@router.post("/import", response_model=UserImportReportDto)
+async def import_users(
+    request: Request,
+    user: CurrentUser,
+    session: DbSession,
+    format: UsersFileFormat = UsersFileFormat.NDJSON,
+):
+    """
+    Массовое создание пользователей из тела запроса (только для администраторов).
+    NDJSON - объект на строку, CSV - с заголовком nickname,login,password
+    """
+    return await user_controller.import_users(request.stream(), format, user, session)
 
 
 @router.get("/public/{user_id}", response_model=UserOutDto)
+@query_budget(1)
 async def get_user_by_id(
-    user_id: int = Path(..., gt=0), session: AsyncSession = Depends(get_db)
+    session: DbReadSession, user_id: int = Path(..., gt=0)
 ):
     """Возвращает публичную информацию о пользователе с данным user_id"""
-    return await user_controller.get_user_by_id(user_id, session)
+    return fast_response(await user_controller.get_user_by_id(user_id, session))
 
 
 @router.get("/me", response_model=UserOutDto)
-async def get_current_user_info(
-    user=Depends(user_controller.authentication.get_current_user),
-    session: AsyncSession = Depends(get_db),
-):
+@query_budget(1)
+async def get_current_user_info(user: CurrentUser):
     """Возвращает подробную информацию о текущем аутентифицированном пользователе"""
-    return await user_controller.get_user_by_id(user.id, session)
+    # Аутентификация уже загрузила актуальные данные пользователя (из кеша,
+    # который сбрасывается при изменениях, или из бд) - второе чтение не нужно
+    return fast_response(user)
 
 
 @router.patch("/change-role", response_model=UserOutDto)
+@query_budget(3)
 async def change_user_role(
     dto: UserInChangeRoleDto,
-    user=Depends(user_controller.authentication.get_current_user),
-    session: AsyncSession = Depends(get_db),
+    user: CurrentUser,
+    session: DbSession,
 ):
     """Изменение роли пользователя по user_id"""
     return await user_controller.change_role(dto, user, session)
 
 
 @router.patch("/change-activity", response_model=UserOutDto)
+@query_budget(3)
 async def change_user_activity(
     dto: ChangeUserActivityInDto,
-    user=Depends(user_controller.authentication.get_current_user),
-    session: AsyncSession = Depends(get_db),
+    user: CurrentUser,
+    session: DbSession,
 ):
     """Изменение активности пользователя по user_id"""
     return await user_controller.change_user_activity(dto, user, session)
 
 
+@router.patch("/change-role/bulk", response_model=UserBulkChangeReportDto)
+@query_budget(3)
+async def change_users_role(
+    dto: UserInBulkChangeRoleDto,
+    user: CurrentUser,
+    session: DbSession,
+):
+    """Изменение роли у списка пользователей. Результат возвращается по каждому user_id"""
+    return await user_controller.change_role_bulk(dto, user, session)
+
+
+@router.patch("/change-activity/bulk", response_model=UserBulkChangeReportDto)
+@query_budget(3)
+async def change_users_activity(
+    dto: BulkChangeUserActivityInDto,
+    user: CurrentUser,
+    session: DbSession,
+):
+    """Изменение активности у списка пользователей. Результат возвращается по каждому user_id"""
+    return await user_controller.change_user_activity_bulk(dto, user, session)
+
+
 @router.patch("/email", response_model=UserOutDto)
+@query_budget(3)
 async def set_email_for_user(
     email: str,
-    user=Depends(user_controller.authentication.get_current_user),
-    session: AsyncSession = Depends(get_db),
+    user: CurrentUser,
+    session: DbSession,
 ):
     """Установка почты для текущего пользователя"""
     return await user_controller.set_email(email, user, session)
 
 
 @router.patch("/email-active", response_model=UserOutDto)
+@query_budget(3)
 async def verify_email_for_user(
-    user=Depends(user_controller.authentication.get_current_user),
-    session: AsyncSession = Depends(get_db),
+    user: CurrentUser,
+    session: DbSession,
 ):
     """Заглушка установки состояния проверки почты для текущего пользователя"""
     # можно конечно было сделать через smtp протокол (соответственную библиотеку) но решил что это излишне для тестового задания
@@ -119,19 +224,21 @@ async def verify_email_for_user(
 
 
 @router.patch("/delete-email", response_model=UserOutDto)
+@query_budget(3)
 async def delete_email_for_user(
-    user=Depends(user_controller.authentication.get_current_user),
-    session: AsyncSession = Depends(get_db),
+    user: CurrentUser,
+    session: DbSession,
 ):
     """Удаление почты для текущего пользователя"""
     return await user_controller.delete_email(user, session)
 
 
 @router.patch("/change-field", response_model=UserOutDto)
+@query_budget(4)
 async def change_user_field_endpoint(
     dto: UserChangeFieldInDto,
-    user=Depends(user_controller.authentication.get_current_user),
-    session: AsyncSession = Depends(get_db)
+    user: CurrentUser,
+    session: DbSession
 ):
     """Изменение поля у текущего пользователя"""
     return await user_controller.change_user_field(dto, user, session)
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Накладные расходы зависимостей аутентификации с кешем проверенных токенов и без него.
+
+    claims - get_current_user_claims (TokenUser): только проверка токена
+    user   - get_current_user (CurrentUser) с прогретым кешем пользователей,
+             то есть проверка токена + чтение из user_cache без запроса в бд
+
+--tokens разных токенов (клиентов) используются по кругу, --calls вызовов на режим.
+Бд не нужна.
+
+Запуск из директории backend:
+    python -m benchmarks.auth_overhead --tokens 1000 --calls 100000
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import argparse
+import asyncio
+import json
+import time
+
+from app.controllers.user.authentication import (
+    create_access_token,
+    get_current_user,
+    get_current_user_claims,
+    new_session_id,
+)
+from app.models.user import UserRole
+from app.schemas.user import UserOutDto
+from app.services.token_cache import token_cache
+from app.services.user_cache import user_cache
+
+
+def build_tokens(count: int) -> list[str]:
+    now = datetime.now(timezone.utc)
+    tokens = []
+    for i in range(1, count + 1):
+        user = SimpleNamespace(id=i, login=f"bench_user_{i}", role=UserRole.USER)
+        tokens.append(create_access_token(user, new_session_id()))
+        user_cache.set(
+            UserOutDto.model_construct(
+                id=i,
+                nickname=f"Пользователь-{i}",
+                login=user.login,
+                role=UserRole.USER.value,
+                is_active=True,
+                is_email_verified=False,
+                created_at=now,
+                updated_at=now,
+            )
+        )
+    return tokens
+
+
+async def call_claims(token: str) -> None:
+    await get_current_user_claims(token)
+
+
+async def call_user(token: str) -> None:
+    await get_current_user(db=None, token=token)
+
+
+async def measure(call, tokens: list[str], calls: int) -> float:
+    count = len(tokens)
+    started = time.perf_counter()
+    for i in range(calls):
+        await call(tokens[i % count])
+    return (time.perf_counter() - started) / calls
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    # Кеш пользователей должен вмещать всех клиентов, чтобы не ходить в бд
+    user_cache.max_size = max(user_cache.max_size, args.tokens)
+    user_cache.ttl_seconds = 3600
+    tokens = build_tokens(args.tokens)
+    cache_size = token_cache.max_size or args.tokens
+
+    results = []
+    for name, call in (("claims", call_claims), ("user", call_user)):
+        token_cache.max_size = 0
+        token_cache.clear()
+        uncached = await measure(call, tokens, args.calls)
+
+        token_cache.max_size = cache_size
+        token_cache.clear()
+        token_cache.hits = token_cache.misses = token_cache.evictions = 0
+        cached = await measure(call, tokens, args.calls)
+
+        results.append(
+            {
+                "dependency": name,
+                "no_cache_us": round(uncached * 1_000_000, 1),
+                "cache_us": round(cached * 1_000_000, 1),
+                "speedup": round(uncached / cached, 1),
+                "token_cache": token_cache.stats(),
+            }
+        )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Потребление памяти при потоковой выгрузке пользователей.
+
+Засевает бд до --users пользователей, прогоняет export_chunks и снимает RSS
+процесса после каждых --sample строк. При стриминге из серверного курсора
+RSS должен оставаться плоским независимо от размера таблицы.
+
+Запуск из директории backend:
+    python -m benchmarks.export_rss --users 1000000 --format csv --gzip
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from app.config import settings
+from app.controllers.user.admin import export_chunks
+from app.database.database import engine
+from app.schemas.user import UsersFileFormat, UserExportQueryDto
+from app.services.passwords import password_hasher
+from benchmarks.seed import seed_users, count_users
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=[f.value for f in UsersFileFormat], default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--sample", type=int, default=100_000)
+    args = parser.parse_args()
+
+    await seed_users(args.users)
+    total = await count_users()
+
+    query_dto = UserExportQueryDto(format=args.format, gzip=args.gzip)
+    batch_size = settings.USERS_EXPORT_BATCH_SIZE
+
+    samples = [{"rows": 0, "rss_mb": round(rss_mb(), 1)}]
+    rows = 0
+    output_bytes = 0
+    started = time.perf_counter()
+
+    async for chunk in export_chunks(query_dto):
+        output_bytes += len(chunk)
+        rows += batch_size
+        if rows % args.sample < batch_size:
+            samples.append({"rows": rows, "rss_mb": round(rss_mb(), 1)})
+
+    elapsed = time.perf_counter() - started
+    rss_values = [sample["rss_mb"] for sample in samples[1:]] or [samples[0]["rss_mb"]]
+
+    print(
+        json.dumps(
+            {
+                "format": args.format,
+                "gzip": args.gzip,
+                "rows": total,
+                "output_mb": round(output_bytes / 1024 / 1024, 1),
+                "elapsed_s": round(elapsed, 2),
+                "rows_per_s": round(total / elapsed),
+                "rss_start_mb": samples[0]["rss_mb"],
+                "rss_max_mb": max(rss_values),
+                "rss_spread_mb": round(max(rss_values) - min(rss_values), 1),
+                "samples": samples,
+            },
+            indent=2,
+        )
+    )
+
+    password_hasher.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,352 @@
+"""
+Нагрузочный тест API пользователей от запроса до бд.
+
+Сценарии:
+    login    - POST /users/login, вход случайных пользователей (хеширование пароля)
+    me       - GET /users/me с заранее выпущенными access-токенами
+    list     - GET /users, первая страница или следующая по next_cursor
+    register - POST /users, регистрация новых пользователей
+    admin    - PATCH /users/change-activity и /users/change-activity/bulk от администратора
+
+Цель - приложение из app.main в процессе (--target asgi, через httpx.ASGITransport
+с запуском lifespan) или запущенный сервер (--target http://localhost:8000).
+Бд наполняется до --users синтетических пользователей (benchmarks.seed),
+выборка пользователей и выпуск токенов идут напрямую через бд и JWT_SECRET
+из настроек, поэтому удаленный сервер должен работать с той же бд и тем же .env.
+Зарегистрированные тестом пользователи удаляются в конце.
+
+Каждый сценарий на каждом уровне --concurrency: --warmup секунд прогрева без учета,
+затем --seconds секунд замера. Клиенты шлют запросы по кругу без пауз.
+Результат - JSON с пропускной способностью и перцентилями задержки,
+--output сохраняет его в файл, --compare печатает разницу с предыдущим прогоном.
+
+Ограничитель входа в режиме asgi отключается (--keep-limiter оставляет его),
+для удаленного сервера запускайте его с AUTH_LIMITER_ENABLED=false,
+иначе login и register упрутся в 429.
+
+Запуск из директории backend:
+    python -m benchmarks.load_test --users 100000 --concurrency 10 50 100
+    python -m benchmarks.load_test --target http://localhost:8000 --scenarios me list \\
+        --output results.json --compare baseline.json
+"""
+
+from collections import Counter
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Awaitable, Callable
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import subprocess
+import time
+
+from sqlalchemy import delete, func, select, update
+import httpx
+
+from app.config import settings
+from app.controllers.user.authentication import create_access_token, new_session_id
+from app.database.database import engine
+from app.main import app
+from app.models.user import UserModel, UserRole
+from app.services.passwords import password_hasher
+from app.services.rate_limit import auth_limiter
+from benchmarks.pool_load import percentile
+from benchmarks.seed import BENCH_PASSWORD, count_users, seed_users
+
+
+SCENARIOS = ("login", "me", "list", "register", "admin")
+BULK_SIZE = 50
+
+# NICKNAME_REGEX не пропускает цифры: шестнадцатеричные цифры run_id и номер
+# регистрации записываются в никнейме буквами
+NICKNAME_LETTERS = str.maketrans("0123456789abcdef", "abcdefghijklmnop")
+
+Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+async def sample_users(role: UserRole, is_active: bool, limit: int) -> list:
+    """Случайные синтетические пользователи из benchmarks.seed"""
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            select(UserModel.id, UserModel.login, UserModel.role)
+            .where(
+                UserModel.login.startswith("bench_", autoescape=True),
+                UserModel.role == role,
+                UserModel.is_active == is_active,
+            )
+            .order_by(func.random())
+            .limit(limit)
+        )
+        return [SimpleNamespace(**row._mapping) for row in result]
+
+
+def bearer(user) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user, new_session_id())}"}
+
+
+class Scenarios:
+    """Данные сценариев и генерация запросов"""
+
+    def __init__(self, users: list, admin, targets: list, run_id: str):
+        self.users = users
+        self.me_headers = [bearer(user) for user in users]
+        self.admin_headers = bearer(admin)
+        self.run_id = run_id
+        self.registered = itertools.count()
+
+        # Цели админских изменений выдаются клиенту в монопольное пользование,
+        # чтобы два клиента не меняли активность одного пользователя и флаг
+        # всегда менялся. Половина целей - по одной, половина - пачками для bulk
+        ids = [target.id for target in targets]
+        single, grouped = ids[: len(ids) // 2], ids[len(ids) // 2 :]
+        self.targets: asyncio.Queue = asyncio.Queue()
+        for user_id in single:
+            self.targets.put_nowait([user_id])
+        self.batches: asyncio.Queue = asyncio.Queue()
+        for start in range(0, len(grouped) - BULK_SIZE + 1, BULK_SIZE):
+            self.batches.put_nowait(grouped[start : start + BULK_SIZE])
+        # Цели выбраны среди неактивных пользователей
+        self.active: dict[int, bool] = {}
+
+    def request(self, scenario: str) -> Request:
+        return getattr(self, f"_{scenario}")
+
+    async def _login(self, client: httpx.AsyncClient) -> httpx.Response:
+        user = random.choice(self.users)
+        return await client.post(
+            "/users/login", data={"username": user.login, "password": BENCH_PASSWORD}
+        )
+
+    async def _me(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/users/me", headers=random.choice(self.me_headers))
+
+    async def _list(self, client: httpx.AsyncClient) -> httpx.Response:
+        response = await client.get("/users", params={"limit": 50})
+        cursor = response.json().get("next_cursor") if response.is_success else None
+        if cursor and random.random() < 0.5:
+            return await client.get("/users", params={"limit": 50, "cursor": cursor})
+        return response
+
+    async def _register(self, client: httpx.AsyncClient) -> httpx.Response:
+        n = next(self.registered)
+        suffix = f"{self.run_id}-{n}".translate(NICKNAME_LETTERS)
+        return await client.post(
+            "/users",
+            json={
+                "login": f"load_{self.run_id}_{n}",
+                "nickname": f"load-{suffix}",
+                "password": BENCH_PASSWORD,
+            },
+        )
+
+    async def _admin(self, client: httpx.AsyncClient) -> httpx.Response:
+        bulk = random.random() < 0.5 and not self.batches.empty()
+        queue = self.batches if bulk else self.targets
+        ids = await queue.get()
+        flag = not self.active.get(ids[0], False)
+        try:
+            if bulk:
+                response = await client.patch(
+                    "/users/change-activity/bulk",
+                    json={"activity_flag": flag, "user_ids": ids},
+                    headers=self.admin_headers,
+                )
+            else:
+                response = await client.patch(
+                    "/users/change-activity",
+                    json={"activity_flag": flag, "user_id": ids[0]},
+                    headers=self.admin_headers,
+                )
+            if response.is_success:
+                self.active.update(dict.fromkeys(ids, flag))
+            return response
+        finally:
+            queue.put_nowait(ids)
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    request: Request,
+    concurrency: int,
+    seconds: float,
+    warmup: float,
+) -> dict:
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + seconds
+
+    async def worker() -> None:
+        while (started := time.perf_counter()) < deadline:
+            try:
+                status = (await request(client)).status_code
+            except Exception as e:
+                status = type(e).__name__
+            if started >= measure_from:
+                latencies.append(time.perf_counter() - started)
+                statuses[status] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    errors = sum(
+        count for status, count in statuses.items()
+        if not isinstance(status, int) or status >= 400
+    )
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / seconds, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(report: dict, baseline: dict) -> list[str]:
+    """Изменение rps и p95 относительно baseline по сценарию и уровню нагрузки"""
+    previous = {
+        (result["scenario"], result["concurrency"]): result
+        for result in baseline.get("results", [])
+    }
+    lines = []
+    for result in report["results"]:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if not before or not before["rps"] or not before["p95_ms"]:
+            continue
+        rps = (result["rps"] / before["rps"] - 1) * 100
+        p95 = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+        lines.append(
+            f"{result['scenario']:<9} c={result['concurrency']:<4} "
+            f"rps {before['rps']:>9} -> {result['rps']:>9} ({rps:+.1f}%)  "
+            f"p95 {before['p95_ms']:>8} -> {result['p95_ms']:>8} ms ({p95:+.1f}%)"
+        )
+    return lines
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--target", default="asgi", help="asgi или URL сервера")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--users", type=int, default=10000, help="размер бд, 10k-1M")
+    parser.add_argument("--sample", type=int, default=1000, help="пользователей в сценариях")
+    parser.add_argument("--keep-limiter", action="store_true")
+    parser.add_argument("--seed", type=int, default=0, help="seed для random")
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    created = await seed_users(args.users)
+    total_users = await count_users()
+
+    users = await sample_users(UserRole.USER, True, args.sample)
+    admins = await sample_users(UserRole.ADMIN, True, 1)
+    targets = await sample_users(UserRole.USER, False, args.sample)
+    if not users or not admins or not targets:
+        raise SystemExit("Not enough seeded users, increase --users")
+
+    run_id = format(int(time.time()), "x")
+    scenarios = Scenarios(users, admins[0], targets, run_id)
+
+    async with AsyncExitStack() as stack:
+        if args.target == "asgi":
+            # lifespan приложения: пул хеширования, фоновые задачи, инициализация
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            if not args.keep_limiter:
+                auth_limiter.enabled = False
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://load-test"
+            )
+        else:
+            client = httpx.AsyncClient(
+                base_url=args.target,
+                limits=httpx.Limits(max_connections=None, max_keepalive_connections=None),
+                timeout=30,
+            )
+        await stack.enter_async_context(client)
+
+        # Сценарий, который отвечает ошибками, измерял бы скорость отказов
+        for scenario in args.scenarios:
+            response = await scenarios.request(scenario)(client)
+            if not response.is_success:
+                raise SystemExit(
+                    f"Scenario {scenario} failed: {response.status_code} {response.text}"
+                )
+
+        results = []
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                result = await run_level(
+                    client,
+                    scenarios.request(scenario),
+                    concurrency,
+                    args.seconds,
+                    args.warmup,
+                )
+                results.append({"scenario": scenario, **result})
+
+        async with engine.begin() as conn:
+            await conn.execute(
+                delete(UserModel).where(
+                    UserModel.login.startswith(f"load_{run_id}_", autoescape=True)
+                )
+            )
+            # Вернуть исходную активность целям админского сценария
+            await conn.execute(
+                update(UserModel)
+                .where(UserModel.id.in_([target.id for target in targets]))
+                .values(is_active=False)
+            )
+
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "target": args.target,
+        "python": platform.python_version(),
+        "users": total_users,
+        "seeded": created,
+        "seconds": args.seconds,
+        "settings": {
+            "password_hash_scheme": settings.PASSWORD_HASH_SCHEME,
+            "password_hash_cost": settings.PASSWORD_HASH_COST,
+            "pool_limits": settings.DATABASE_POOL_LIMITS,
+            "web_concurrency": settings.WEB_CONCURRENCY,
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(report, json.load(f))))
+
+    password_hasher.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
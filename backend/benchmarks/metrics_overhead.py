@@ -0,0 +1,138 @@
+"""
+Накладные расходы метрик.
+
+    http   - запрос к минимальному FastAPI-приложению через ASGI
+             без MetricsMiddleware и с ним
+    query  - работа обработчиков before/after_cursor_execute на один запрос к бд
+    render - формирование ответа /metrics для --routes маршрутов
+
+Бд не нужна.
+
+Запуск из директории backend:
+    python -m benchmarks.metrics_overhead --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+
+from app.services.metrics import (
+    MetricsMiddleware,
+    db_query_duration,
+    http_request_duration,
+    render_metrics,
+    statement_type,
+)
+
+
+def build_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/users/public/{user_id}")
+    async def get_user(user_id: int):
+        return {"id": user_id}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def call(app, path: str) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure_http(app, requests: int) -> float:
+    started = time.perf_counter()
+    for i in range(requests):
+        await call(app, f"/users/public/{i}")
+    return (time.perf_counter() - started) / requests
+
+
+async def compare_http(requests: int, repeat: int) -> tuple[float, float]:
+    """Лучшее из repeat чередующихся прогонов, чтобы не зависеть от порядка и шума"""
+    plain_app, instrumented_app = build_app(False), build_app(True)
+    for app in (plain_app, instrumented_app):
+        await measure_http(app, 100)  # прогрев
+
+    plain, instrumented = [], []
+    for _ in range(repeat):
+        plain.append(await measure_http(plain_app, requests))
+        instrumented.append(await measure_http(instrumented_app, requests))
+    return min(plain), min(instrumented)
+
+
+def measure_query(queries: int) -> float:
+    statement = "SELECT users.id, users.login FROM users WHERE users.id = $1::INTEGER"
+    started = time.perf_counter()
+    for _ in range(queries):
+        query_started = time.perf_counter()
+        db_query_duration.observe(
+            time.perf_counter() - query_started, "primary", statement_type(statement)
+        )
+    return (time.perf_counter() - started) / queries
+
+
+def measure_render(routes: int) -> tuple[float, int]:
+    for route in range(routes):
+        for status in (200, 400, 401, 404, 500):
+            http_request_duration.observe(0.01, "GET", f"/route/{route}", status)
+
+    started = time.perf_counter()
+    body = render_metrics()
+    return time.perf_counter() - started, len(body)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--routes", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    plain, instrumented = await compare_http(args.requests, args.repeat)
+    query = measure_query(args.requests)
+    render, render_bytes = measure_render(args.routes)
+
+    print(
+        json.dumps(
+            {
+                "http_us": {
+                    "without_metrics": round(plain * 1_000_000, 1),
+                    "with_metrics": round(instrumented * 1_000_000, 1),
+                    "overhead": round((instrumented - plain) * 1_000_000, 1),
+                },
+                "query_overhead_us": round(query * 1_000_000, 2),
+                "render_ms": round(render * 1000, 2),
+                "render_bytes": render_bytes,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
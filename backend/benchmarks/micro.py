@@ -0,0 +1,270 @@
+"""
+Микробенчмарки горячих функций со сравнением с сохраненным baseline.
+
+    tokens     - create_access_token, create_refresh_token, verify_token
+                 (с кешем проверенных токенов и без него)
+    passwords  - UserModel.set_password / verify_password через пул хеширования
+    dto        - UserOutDto.new, валидация UserInDto из dict и из JSON
+    regex      - NICKNAME_REGEX и EMAIL_REGEX (create_user, change_user_field, set_email),
+                 в том числе на строке, где регулярное выражение не совпадает
+
+Каждый случай выполняется --repeat раз, количество вызовов в повторе подбирается
+так, чтобы повтор длился не меньше --min-time секунд. Основная метрика - лучшее
+время вызова (наименее зашумленное), рядом медиана.
+
+Сравнение с baseline: случай считается регрессией, если лучшее время выросло
+больше чем на порог (--threshold, для хеширования паролей - --hash-threshold)
+и замедление подтвердилось повторным замером. При регрессии процесс завершается
+с кодом 1, что останавливает CI перед деплоем.
+Baseline зависит от машины и настроек хеширования: сохраняйте его на той же машине,
+где выполняется сравнение. Бд не нужна.
+
+Запуск из директории backend:
+    python -m benchmarks.micro --save-baseline micro_baseline.json
+    python -m benchmarks.micro --baseline micro_baseline.json --output micro.json
+    python -m benchmarks.micro --filter verify_token regex
+"""
+
+from datetime import datetime, timezone
+from statistics import median
+from typing import Awaitable, Callable, Union
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from app.config import settings
+from app.controllers.user.authentication import (
+    create_access_token,
+    create_refresh_token,
+    new_session_id,
+    verify_token,
+)
+from app.controllers.user.email import EMAIL_REGEX
+from app.controllers.user.user import NICKNAME_REGEX, new_user_error
+from app.models.user import UserModel, UserRole
+from app.schemas.user import UserInDto, UserOutDto
+from app.services.passwords import password_hasher
+from app.services.token_cache import token_cache
+
+
+Case = Callable[[], Union[object, Awaitable[object]]]
+
+PASSWORD = "bench-password"
+
+
+def build_user() -> UserModel:
+    now = datetime.now(timezone.utc)
+    return UserModel(
+        id=42,
+        nickname="Пользователь-Тест",
+        login="bench_user_42",
+        hashed_password="",
+        email="bench_user_42@example.com",
+        role=UserRole.USER,
+        bio="Пользователь для микробенчмарков",
+        is_active=True,
+        is_email_verified=True,
+        last_login=now,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+async def build_cases() -> dict[str, Case]:
+    user = build_user()
+    await user.set_password(PASSWORD)
+    session_id = new_session_id()
+    access_token = create_access_token(user, session_id)
+    user_in = {"nickname": "Новый Пользователь", "login": "new_user_42", "password": PASSWORD}
+    user_in_json = json.dumps(user_in).encode()
+    user_in_dto = UserInDto(**user_in)
+
+    def verify_token_uncached():
+        token_cache.clear()
+        return verify_token(access_token, "access")
+
+    return {
+        "create_access_token": lambda: create_access_token(user, session_id),
+        "create_refresh_token": lambda: create_refresh_token(user, session_id),
+        "verify_token[cached]": lambda: verify_token(access_token, "access"),
+        "verify_token[uncached]": verify_token_uncached,
+        "set_password": lambda: user.set_password(PASSWORD),
+        "verify_password": lambda: user.verify_password(PASSWORD),
+        "UserOutDto.new": lambda: UserOutDto.new(user),
+        "UserInDto.model_validate": lambda: UserInDto.model_validate(user_in),
+        "UserInDto.model_validate_json": lambda: UserInDto.model_validate_json(user_in_json),
+        "new_user_error": lambda: new_user_error(user_in_dto),
+        "NICKNAME_REGEX[match]": lambda: NICKNAME_REGEX.fullmatch("Иван Петров-Сидоров"),
+        "NICKNAME_REGEX[mismatch]": lambda: NICKNAME_REGEX.fullmatch("Иван Петров " * 3 + "1"),
+        "EMAIL_REGEX[match]": lambda: EMAIL_REGEX.fullmatch("bench.user+42@mail.example.com"),
+        "EMAIL_REGEX[mismatch]": lambda: EMAIL_REGEX.fullmatch("a." * 30 + "@" + "b." * 30),
+    }
+
+
+# Хеширование идет через пул процессов и шумит сильнее остальных случаев
+HASH_CASES = {"set_password", "verify_password"}
+
+
+async def _time(case: Case, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        result = case()
+        if inspect.isawaitable(result):
+            await result
+    return time.perf_counter() - started
+
+
+async def autorange(case: Case, min_time: float) -> int:
+    """Количество вызовов 1, 2, 5, 10, 20, 50 ..., при котором повтор длится не меньше min_time"""
+    base = 1
+    while True:
+        for multiplier in (1, 2, 5):
+            number = base * multiplier
+            if await _time(case, number) >= min_time:
+                return number
+        base *= 10
+
+
+async def measure(case: Case, repeat: int, min_time: float) -> dict:
+    number = await autorange(case, min_time)
+    timings = [await _time(case, number) / number for _ in range(repeat)]
+
+    best = min(timings)
+    return {
+        "best_ns": round(best * 1e9),
+        "median_ns": round(median(timings) * 1e9),
+        "ops_per_second": round(1 / best),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "cpu_count": os.cpu_count(),
+        "password_hash": f"{password_hasher.scheme}:{password_hasher.cost}",
+        "token_codec": settings.TOKEN_CODEC,
+        "algorithm": settings.ALGORITHM,
+    }
+
+
+def compare(
+    report: dict, baseline: dict, threshold: float, hash_threshold: float
+) -> tuple[list[str], list[str]]:
+    """Строки отчета и список регрессий относительно baseline"""
+    lines, regressions = [], []
+
+    for key in ("python", "machine", "password_hash", "token_codec", "algorithm"):
+        if baseline["environment"].get(key) != report["environment"].get(key):
+            lines.append(
+                f"warning: {key} differs from baseline: "
+                f"{baseline['environment'].get(key)} -> {report['environment'].get(key)}"
+            )
+
+    for name, result in report["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            lines.append(f"{name:<32} new")
+            continue
+
+        change = result["best_ns"] / before["best_ns"] - 1
+        limit = hash_threshold if name in HASH_CASES else threshold
+        status = "REGRESSION" if change > limit else "ok"
+        if status == "REGRESSION":
+            regressions.append(name)
+        lines.append(
+            f"{name:<32} {before['best_ns']:>12} -> {result['best_ns']:>12} ns "
+            f"({change * 100:+.1f}%, limit +{limit * 100:.0f}%) {status}"
+        )
+
+    return lines, regressions
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--filter", nargs="+", help="подстроки имен случаев")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--hash-threshold", type=float, default=0.5)
+    parser.add_argument("--baseline")
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    try:
+        cases = await build_cases()
+        if args.filter:
+            cases = {
+                name: case for name, case in cases.items()
+                if any(part in name for part in args.filter)
+            }
+
+        results = {}
+        for name, case in cases.items():
+            results[name] = await measure(case, args.repeat, args.min_time)
+    finally:
+        password_hasher.shutdown()
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "results": results,
+    }
+
+    lines, regressions = [], []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(report, baseline, args.threshold, args.hash_threshold)
+
+        # Повторный замер отсекает одиночные всплески шума (другие процессы, частота CPU):
+        # регрессией считается только подтвердившееся замедление
+        if regressions:
+            try:
+                for name in regressions:
+                    retry = await measure(cases[name], args.repeat, args.min_time)
+                    if retry["best_ns"] < results[name]["best_ns"]:
+                        results[name] = retry
+            finally:
+                password_hasher.shutdown()
+            lines, regressions = compare(report, baseline, args.threshold, args.hash_threshold)
+
+    # Отчет пишется после повторного замера, чтобы в нем были итоговые результаты
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if not args.baseline:
+        return 0
+
+    print("\n".join(lines), file=sys.stderr)
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,83 @@
+"""
+Сравнение чтения пользователей ORM-сущностями и строками с колонками UserOutDto.
+
+Засевает бд до --users пользователей и --repeat раз читает их:
+    orm  - select(UserModel) + UserOutDto.new (identity map, hashed_password, bio)
+    rows - select(*USER_OUT_COLUMNS) + UserOutDto.from_row
+
+Запуск из директории backend:
+    python -m benchmarks.orm_vs_rows --users 10000
+"""
+
+from sqlalchemy import select
+import argparse
+import asyncio
+import json
+import time
+
+from app.database.database import AsyncSessionLocal, engine
+from app.models.user import UserModel
+from app.repositories.user import select_users_out, get_users_out
+from app.schemas.user import UserOutDto
+from app.services.passwords import password_hasher
+from benchmarks.seed import seed_users
+
+
+async def read_orm(limit: int) -> int:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(UserModel).order_by(UserModel.id).limit(limit))
+        return len([UserOutDto.new(user) for user in result.scalars().all()])
+
+
+async def read_rows(limit: int) -> int:
+    async with AsyncSessionLocal() as session:
+        query = select_users_out().order_by(UserModel.id).limit(limit)
+        return len(await get_users_out(session, query))
+
+
+async def measure(read, limit: int, repeat: int) -> dict:
+    await read(limit)  # прогрев пула соединений и кеша запросов
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = await read(limit)
+        timings.append(time.perf_counter() - started)
+
+    best = min(timings)
+    return {
+        "rows": rows,
+        "best_ms": round(best * 1000, 1),
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 1),
+        "rows_per_s": round(rows / best),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    await seed_users(args.users)
+
+    orm = await measure(read_orm, args.users, args.repeat)
+    rows = await measure(read_rows, args.users, args.repeat)
+
+    print(
+        json.dumps(
+            {
+                "orm": orm,
+                "rows": rows,
+                "speedup": round(orm["best_ms"] / rows["best_ms"], 2),
+            },
+            indent=2,
+        )
+    )
+
+    password_hasher.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+"""
+Нагрузочный тест пула соединений: сколько одновременных запросов
+обслуживает пул из --pool-size соединений с ленивой сессией get_db.
+
+Приложение вызывается в процессе через ASGI (httpx.ASGITransport),
+движок пересоздается с pool_size=--pool-size и max_overflow=0.
+На каждом уровне --concurrency клиенты --seconds секунд по кругу запрашивают
+GET /users/public/{id} и GET /users?limit=50. В отчете - пропускная способность,
+перцентили задержки, ошибки (в том числе таймауты ожидания пула)
+и максимум одновременно занятых соединений.
+
+Запуск из директории backend:
+    python -m benchmarks.pool_load --pool-size 20 --concurrency 20 50 100 200 400
+"""
+
+from sqlalchemy.ext.asyncio import create_async_engine
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from app.config import settings
+from app.database.database import (
+    AsyncSessionLocal,
+    ReplicaSessionLocal,
+    engine,
+    replica_engine,
+)
+from app.main import app
+from app.services.passwords import password_hasher
+from benchmarks.seed import count_users, seed_users
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run_level(
+    client: httpx.AsyncClient, pool, concurrency: int, seconds: float, users: int
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    max_checked_out = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            if random.random() < 0.8:
+                url = f"/users/public/{random.randint(1, users)}"
+            else:
+                url = "/users?limit=50"
+
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                if response.status_code >= 500:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    async def sample_pool() -> None:
+        nonlocal max_checked_out
+        while time.perf_counter() < deadline:
+            max_checked_out = max(max_checked_out, pool.checkedout())
+            await asyncio.sleep(0.005)
+
+    started = time.perf_counter()
+    await asyncio.gather(sample_pool(), *(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "errors": errors,
+        "max_checked_out": max_checked_out,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--pool-timeout", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[20, 50, 100, 200, 400])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args()
+
+    await seed_users(args.users)
+    users = await count_users()
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+    bench_engine = create_async_engine(
+        settings.DATABASE_URL,
+        pool_size=args.pool_size,
+        max_overflow=0,
+        pool_timeout=args.pool_timeout,
+        connect_args={"server_settings": {"jit": "off", "application_name": "pool_load"}},
+    )
+    # Читающие эндпоинты берут сессию из ReplicaSessionLocal (реплика или основная бд),
+    # поэтому на тестовый движок переключаются обе фабрики сессий
+    AsyncSessionLocal.configure(bind=bench_engine)
+    ReplicaSessionLocal.configure(bind=bench_engine)
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for concurrency in args.concurrency:
+            results.append(
+                await run_level(
+                    client, bench_engine.pool, concurrency, args.seconds, users
+                )
+            )
+
+    print(json.dumps({"pool_size": args.pool_size, "levels": results}, indent=2))
+
+    password_hasher.shutdown()
+    await bench_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Наполнение бд синтетическими пользователями для бенчмарков.
+
+Запуск из директории backend:
+    python -m benchmarks.seed --users 100000
+"""
+
+from sqlalchemy import text, bindparam
+import argparse
+import asyncio
+import time
+
+from app.database.database import engine, BaseModel
+from app.models.user import UserModel, UserRole
+from app.services.passwords import password_hasher
+
+
+BENCH_PASSWORD = "bench-password"
+
+# Доли ролей среди синтетических пользователей, остальные - обычные пользователи
+ROLE_SHARES = (
+    (UserRole.GUEST, 0.05),
+    (UserRole.MODERATOR, 0.04),
+    (UserRole.ADMIN, 0.01),
+)
+
+INSERT_USERS = text(
+    """
+    INSERT INTO users (
+        login, nickname, hashed_password, email, role, bio,
+        is_active, is_email_verified, created_at, updated_at
+    )
+    SELECT
+        'bench_' || :prefix || '_' || g,
+        'bench-' || :prefix || '-' || g,
+        :hashed_password,
+        'bench_' || :prefix || '_' || g || '@example.com',
+        :role,
+        'Пользователь для нагрузочного тестирования',
+        g % 20 <> 0,
+        g % 3 = 0,
+        now() - (g || ' seconds')::interval,
+        now()
+    FROM generate_series(1, :count) AS g
+    """
+).bindparams(bindparam("role", type_=UserModel.__table__.c.role.type))
+
+
+async def count_users() -> int:
+    async with engine.connect() as conn:
+        return (await conn.execute(text("SELECT count(*) FROM users"))).scalar()
+
+
+async def seed_users(total: int) -> int:
+    """Досоздает пользователей до total. Возвращает количество созданных"""
+    async with engine.begin() as conn:
+        await conn.run_sync(BaseModel.metadata.create_all)
+
+    missing = total - await count_users()
+    if missing <= 0:
+        return 0
+
+    hashed_password = await password_hasher.hash(BENCH_PASSWORD)
+    prefix = str(int(time.time()))
+    remaining = missing
+
+    async with engine.begin() as conn:
+        for role, share in ROLE_SHARES + ((UserRole.USER, 1.0),):
+            count = remaining if role == UserRole.USER else int(missing * share)
+            await conn.execute(
+                INSERT_USERS,
+                {
+                    "prefix": f"{prefix}{role.value}",
+                    "hashed_password": hashed_password,
+                    "role": role,
+                    "count": count,
+                },
+            )
+            remaining -= count
+
+        await conn.execute(text("ANALYZE users"))
+
+    return missing
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    created = await seed_users(args.users)
+    print(
+        f"created={created} total={await count_users()} "
+        f"elapsed={time.perf_counter() - started:.1f}s"
+    )
+    password_hasher.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Сериализация ответа GET /users: стандартный путь FastAPI против FastJSONResponse.
+
+    default - валидация по response_model (UserPageDto) + jsonable_encoder + json
+    fast    - FastJSONResponse (orjson) по готовым DTO без повторной валидации
+
+Бд не нужна: страницы собираются из синтетических строк так же,
+как это делает UserOutDto.from_row.
+
+Запуск из директории backend:
+    python -m benchmarks.serialization --rows 1000 10000 100000
+"""
+
+from datetime import datetime, timedelta, timezone
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models.user import UserRole
+from app.schemas.user import UserOutDto, UserPageDto
+from app.views.responses import FastJSONResponse
+
+
+def build_page(rows: int) -> UserPageDto:
+    now = datetime.now(timezone.utc)
+    items = [
+        UserOutDto.model_construct(
+            id=i,
+            nickname=f"Пользователь-{i}",
+            login=f"bench_user_{i}",
+            role=UserRole.USER.value,
+            bio="Пользователь для нагрузочного тестирования",
+            last_login=now,
+            email=f"bench_user_{i}@example.com",
+            is_active=True,
+            is_email_verified=i % 3 == 0,
+            created_at=now - timedelta(seconds=i),
+            updated_at=now,
+        )
+        for i in range(1, rows + 1)
+    ]
+    return UserPageDto.model_construct(items=items, next_cursor="MTAwMA")
+
+
+async def render_default(field, page: UserPageDto) -> bytes:
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+async def render_fast(field, page: UserPageDto) -> bytes:
+    return FastJSONResponse(page).body
+
+
+async def measure(render, field, page: UserPageDto, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await render(field, page)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    field = create_model_field("Response_get_users", UserPageDto, mode="serialization")
+    results = []
+
+    for rows in args.rows:
+        page = build_page(rows)
+
+        # Оба пути должны отдавать одинаковый JSON
+        assert json.loads(await render_default(field, page)) == json.loads(
+            await render_fast(field, page)
+        )
+
+        default = await measure(render_default, field, page, args.repeat)
+        fast = await measure(render_fast, field, page, args.repeat)
+        results.append(
+            {
+                "rows": rows,
+                "default_ms": round(default * 1000, 1),
+                "fast_ms": round(fast * 1000, 1),
+                "speedup": round(default / fast, 1),
+            }
+        )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Пропускная способность кодирования и проверки JWT разными кодеками.
+
+    jose-HS256   - прежняя реализация на python-jose
+    native-HS256 - HS256Codec
+    native-EdDSA - AsymmetricCodec с Ed25519
+    native-RS256 - AsymmetricCodec с RSA 2048
+
+Ключи генерируются на время запуска. Бд не нужна.
+
+Запуск из директории backend:
+    python -m benchmarks.token_codecs --operations 20000
+"""
+
+from datetime import datetime, timedelta, timezone
+import argparse
+import json
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from app.services.tokens import AsymmetricCodec, HS256Codec, JoseCodec, TokenCodec
+
+
+SECRET = "benchmark-secret"
+
+
+def _pem_pair(private_key) -> tuple[bytes, bytes]:
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return public_pem, private_pem
+
+
+def build_codecs() -> dict[str, TokenCodec]:
+    return {
+        "jose-HS256": JoseCodec(SECRET),
+        "native-HS256": HS256Codec(SECRET),
+        "native-EdDSA": AsymmetricCodec(
+            "EdDSA", *_pem_pair(ed25519.Ed25519PrivateKey.generate())
+        ),
+        "native-RS256": AsymmetricCodec(
+            "RS256",
+            *_pem_pair(rsa.generate_private_key(public_exponent=65537, key_size=2048)),
+        ),
+    }
+
+
+def build_payload() -> dict:
+    return {
+        "user_id": 42,
+        "login": "bench_user_42",
+        "role": "user",
+        "type": "access",
+        "exp": int((datetime.now(timezone.utc) + timedelta(minutes=30)).timestamp()),
+    }
+
+
+def ops_per_second(fn, arg, operations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(operations):
+        fn(arg)
+    return operations / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--operations", type=int, default=20000)
+    args = parser.parse_args()
+
+    payload = build_payload()
+    codecs = build_codecs()
+
+    # Нативный HS256 совместим с токенами python-jose в обе стороны
+    assert codecs["native-HS256"].decode(codecs["jose-HS256"].encode(payload)) == payload
+    assert codecs["jose-HS256"].decode(codecs["native-HS256"].encode(payload)) == payload
+
+    results = []
+    for name, codec in codecs.items():
+        token = codec.encode(payload)
+        assert codec.decode(token) == payload
+        results.append(
+            {
+                "codec": name,
+                "encode_ops": round(ops_per_second(codec.encode, payload, args.operations)),
+                "decode_ops": round(ops_per_second(codec.decode, token, args.operations)),
+                "token_bytes": len(token),
+            }
+        )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,7 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 # Импортируем модели и настройки
 from app.database.database import BaseModel
 from app.config import settings
-from app.models import UserModel
+from app.models import UserModel, RevokedTokenModel
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
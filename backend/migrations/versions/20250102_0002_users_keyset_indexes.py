@@ -0,0 +1,29 @@
+"""Users keyset pagination indexes
+
+Revision ID: 20250102_0002
+Revises: 20250101_0001
+Create Date: 2025-01-02 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20250102_0002'
+down_revision = '20250101_0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_role_id', 'users', ['role', 'id'], unique=False)
+    op.create_index('ix_users_is_active_id', 'users', ['is_active', 'id'], unique=False)
+    op.create_index('ix_users_is_email_verified_id', 'users', ['is_email_verified', 'id'], unique=False)
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at_id', table_name='users')
+    op.drop_index('ix_users_is_email_verified_id', table_name='users')
+    op.drop_index('ix_users_is_active_id', table_name='users')
+    op.drop_index('ix_users_role_id', table_name='users')
@@ -0,0 +1,119 @@
+"""
+Общие фикстуры тестов.
+
+Тесты с бд ходят в настоящий PostgreSQL (RETURNING, ENUM и ANY(:array) не
+эмулируются), по умолчанию postgres:postgres@localhost:5432/postgres_test.
+Переменные окружения POSTGRES_* имеют приоритет. Если бд недоступна,
+такие тесты пропускаются.
+
+Запуск из директории backend:
+    python -m pytest
+"""
+
+import os
+
+# Настройки тестов задаются до импорта приложения: settings читается при импорте
+os.environ.setdefault("POSTGRES_USER", "postgres")
+os.environ.setdefault("POSTGRES_PASSWORD", "postgres")
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_DB", "postgres_test")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("PASSWORD_HASH_COST", "4")
+os.environ["AUTH_LIMITER_ENABLED"] = "false"
+# Превышение бюджета запросов эндпоинта роняет тест
+os.environ["SQL_QUERY_BUDGET_STRICT"] = "true"
+
+from types import SimpleNamespace
+import asyncio
+import re
+import uuid
+
+from sqlalchemy import delete, text
+import httpx
+import pytest
+
+from app.controllers.user.authentication import create_access_token, new_session_id
+from app.database.database import AsyncSessionLocal, BaseModel, engine
+from app.main import app
+from app.models.user import UserModel, UserRole
+from app.services.passwords import password_hasher
+from app.services.user_cache import user_cache
+
+
+PASSWORD = "password"
+
+_SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def query_count(response: httpx.Response) -> int:
+    """Количество запросов к бд за HTTP-запрос из заголовка Server-Timing"""
+    match = _SERVER_TIMING_QUERIES.search(response.headers["server-timing"])
+    return int(match.group(1))
+
+
+def bearer(user) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user, new_session_id())}"}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def database():
+    try:
+        async with asyncio.timeout(3):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        await engine.dispose()
+        pytest.skip(f"PostgreSQL is not available: {type(e).__name__}: {e}")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(BaseModel.metadata.create_all)
+
+    yield
+
+    password_hasher.shutdown()
+    # Соединения пула привязаны к event loop теста
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def create_user(database):
+    """Фабрика пользователей теста, созданные пользователи удаляются после теста"""
+    prefix = f"test_{uuid.uuid4().hex[:8]}"
+    hashed_password = await password_hasher.hash(PASSWORD)
+    created = 0
+
+    async def factory(role: UserRole = UserRole.USER, **values) -> SimpleNamespace:
+        nonlocal created
+        created += 1
+        async with AsyncSessionLocal() as session:
+            user = UserModel(
+                login=f"{prefix}_{created}",
+                nickname=f"{prefix}-{created}",
+                hashed_password=hashed_password,
+                role=role,
+                **values,
+            )
+            session.add(user)
+            await session.commit()
+            return SimpleNamespace(id=user.id, login=user.login, role=user.role)
+
+    yield factory
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            delete(UserModel).where(UserModel.login.startswith(prefix, autoescape=True))
+        )
+        await session.commit()
+    user_cache.clear()
@@ -0,0 +1,66 @@
+"""
+Иерархия ролей в массовых изменениях: модератор не может изменять
+администраторов и других модераторов, такие id возвращаются как forbidden.
+"""
+
+import pytest
+
+from app.models.user import UserRole
+from tests.conftest import bearer
+
+
+pytestmark = pytest.mark.anyio
+
+
+def statuses(response) -> dict:
+    return {item["user_id"]: item["status"] for item in response.json()["results"]}
+
+
+async def test_moderator_cannot_change_admin_roles(client, create_user):
+    moderator = await create_user(UserRole.MODERATOR)
+    admin = await create_user(UserRole.ADMIN)
+    super_admin = await create_user(UserRole.SUPER_ADMIN)
+    target = await create_user()
+
+    response = await client.patch(
+        "/users/change-role/bulk",
+        json={"role": "guest", "user_ids": [admin.id, super_admin.id, target.id]},
+        headers=bearer(moderator),
+    )
+
+    assert response.status_code == 200
+    assert response.json()["updated"] == 1
+    assert statuses(response) == {
+        admin.id: "forbidden",
+        super_admin.id: "forbidden",
+        target.id: "updated",
+    }
+
+
+@pytest.mark.parametrize("role", ["admin", "super_admin"])
+async def test_moderator_cannot_grant_admin_roles(client, create_user, role):
+    moderator = await create_user(UserRole.MODERATOR)
+    target = await create_user()
+
+    response = await client.patch(
+        "/users/change-role/bulk",
+        json={"role": role, "user_ids": [target.id]},
+        headers=bearer(moderator),
+    )
+
+    assert response.status_code == 403
+
+
+async def test_moderator_cannot_deactivate_super_admin(client, create_user):
+    moderator = await create_user(UserRole.MODERATOR)
+    super_admin = await create_user(UserRole.SUPER_ADMIN)
+
+    response = await client.patch(
+        "/users/change-activity/bulk",
+        json={"activity_flag": False, "user_ids": [super_admin.id]},
+        headers=bearer(moderator),
+    )
+
+    assert response.status_code == 200
+    assert response.json()["updated"] == 0
+    assert statuses(response) == {super_admin.id: "forbidden"}
@@ -0,0 +1,48 @@
+"""Проверки строк импорта, которые отсекаются до обращения к бд"""
+
+from datetime import datetime, timezone
+import json
+
+import pytest
+
+from app.controllers.user.imports import LOGIN_MAX_LENGTH, import_users
+from app.models.user import UserRole
+from app.schemas.user import ImportRowStatus, UserOutDto, UsersFileFormat
+
+
+pytestmark = pytest.mark.anyio
+
+
+def admin() -> UserOutDto:
+    now = datetime.now(timezone.utc)
+    return UserOutDto(
+        id=1,
+        nickname="Админ",
+        login="admin_login",
+        role=UserRole.ADMIN,
+        is_active=True,
+        is_email_verified=True,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+async def body(*records: dict):
+    yield "\n".join(json.dumps(record) for record in records).encode()
+
+
+async def test_login_longer_than_column_is_invalid():
+    login = "x" * (LOGIN_MAX_LENGTH + 1)
+
+    # Все строки отсекаются при проверке, поэтому сессия бд не используется
+    report = await import_users(
+        body({"login": login, "nickname": "Длинный Логин", "password": "password"}),
+        UsersFileFormat.NDJSON,
+        admin(),
+        session=None,
+    )
+
+    assert report.created == 0
+    assert report.invalid == 1
+    assert report.errors[0].line == 1
+    assert report.errors[0].status == ImportRowStatus.INVALID
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+import asyncio
+
+import pytest
+
+from app.services.last_login import LastLoginBuffer
+
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowBuffer(LastLoginBuffer):
+    """Буфер без бд: запись занимает время, чтобы stop пришелся на нее"""
+
+    def __init__(self):
+        super().__init__(flush_interval_ms=10)
+        self.writing = asyncio.Event()
+        self.written: list[dict] = []
+        self.delay = 1.0
+
+    async def _write(self, batch):
+        self.writing.set()
+        await asyncio.sleep(self.delay)
+        self.written.append(dict(batch))
+
+
+async def test_stop_during_flush_keeps_pending_logins():
+    buffer = SlowBuffer()
+    logged_in_at = datetime.now(timezone.utc)
+    buffer.record(1, logged_in_at)
+
+    buffer.start()
+    await buffer.writing.wait()
+    buffer.delay = 0
+    await buffer.stop()
+
+    assert buffer.written == [{1: logged_in_at}]
+    assert buffer.pending == 0
+
+
+async def test_failed_write_is_restored():
+    buffer = SlowBuffer()
+    buffer.delay = 0
+    buffer.record(1, datetime(2026, 1, 1, tzinfo=timezone.utc))
+
+    async def failing_write(batch):
+        raise RuntimeError("database is down")
+
+    buffer._write = failing_write
+    with pytest.raises(RuntimeError):
+        await buffer.flush()
+
+    assert buffer.pending == 1
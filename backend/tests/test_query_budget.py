@@ -0,0 +1,68 @@
+"""
+Бюджет запросов эндпоинта в строгом режиме. Запросы выполняются
+в SQLite в памяти, PostgreSQL не нужен: учет идет по событиям курсора движка
+"""
+
+import logging
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+import httpx
+import pytest
+
+from app.database.accounting import (
+    QueryBudgetExceeded,
+    SqlAccountingMiddleware,
+    instrument_sql_accounting,
+    query_budget,
+)
+from tests.conftest import query_count
+
+
+pytestmark = pytest.mark.anyio
+
+
+def build_app(strict_budget: bool) -> FastAPI:
+    engine = create_engine("sqlite://")
+    instrument_sql_accounting(engine, slow_query_ms=0)
+
+    app = FastAPI()
+    app.add_middleware(SqlAccountingMiddleware, strict_budget=strict_budget)
+
+    @app.get("/queries/{count}")
+    @query_budget(2)
+    async def run_queries(count: int):
+        with engine.connect() as conn:
+            for _ in range(count):
+                conn.execute(text("SELECT 1"))
+        return {"count": count}
+
+    return app
+
+
+def client_for(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_within_budget_passes():
+    async with client_for(build_app(strict_budget=True)) as client:
+        response = await client.get("/queries/2")
+
+    assert response.status_code == 200
+    assert query_count(response) == 2
+
+
+async def test_over_budget_fails_in_strict_mode():
+    async with client_for(build_app(strict_budget=True)) as client:
+        with pytest.raises(QueryBudgetExceeded, match="3 queries, budget 2"):
+            await client.get("/queries/3")
+
+
+async def test_over_budget_is_logged_by_default(caplog):
+    async with client_for(build_app(strict_budget=False)) as client:
+        with caplog.at_level(logging.WARNING, logger="app.database.accounting"):
+            response = await client.get("/queries/3")
+
+    assert response.status_code == 200
+    assert query_count(response) == 3
+    assert "Query budget exceeded [GET /queries/{count}]" in caplog.text
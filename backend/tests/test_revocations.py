@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.controllers.user.authentication import (
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    new_session_id,
+)
+from app.models.user import UserRole
+from app.services.revocations import RevocationStore
+
+
+USER = SimpleNamespace(id=7, login="revoked_user", role=UserRole.USER)
+
+
+def is_revoked(store: RevocationStore, token: str) -> bool:
+    payload = decode_token(token)
+    return store.is_revoked(
+        payload.get("jti") or payload.get("sid"), payload["user_id"], payload["iat"]
+    )
+
+
+def revoke_user(store: RevocationStore) -> None:
+    # Запись не коммитится: сессия без подключения к бд только собирает объекты
+    store.remember(store.revoke_user(AsyncSession(), USER.id))
+
+
+def test_tokens_issued_before_password_change_are_revoked():
+    store = RevocationStore()
+    session_id = new_session_id()
+    access_token = create_access_token(USER, session_id)
+    refresh_token = create_refresh_token(USER, session_id)
+
+    revoke_user(store)
+
+    assert is_revoked(store, access_token)
+    assert is_revoked(store, refresh_token)
+
+
+def test_login_in_same_second_after_password_change_is_valid():
+    store = RevocationStore()
+    revoke_user(store)
+
+    session_id = new_session_id()
+    assert not is_revoked(store, create_access_token(USER, session_id))
+    assert not is_revoked(store, create_refresh_token(USER, session_id))
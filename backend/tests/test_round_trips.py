@@ -0,0 +1,151 @@
+"""
+Количество запросов к бд на мутацию (UPDATE/DELETE ... RETURNING).
+
+Кеш пользователей очищается перед каждым запросом, поэтому в счетчик входит
+загрузка текущего пользователя при аутентификации (один SELECT).
+COMMIT не выполняется через курсор и не считается.
+До перехода на RETURNING операции занимали на 1-2 запроса больше:
+SELECT перед UPDATE и повторный SELECT после коммита.
+"""
+
+import pytest
+
+from app.models.user import UserRole
+from app.services.user_cache import user_cache
+from tests.conftest import PASSWORD, bearer, query_count
+
+
+pytestmark = pytest.mark.anyio
+
+AUTH = 1
+
+
+async def test_change_role_is_single_update(client, create_user):
+    admin = await create_user(UserRole.ADMIN)
+    target = await create_user()
+
+    user_cache.clear()
+    response = await client.patch(
+        "/users/change-role",
+        json={"role": "moderator", "user_id": target.id},
+        headers=bearer(admin),
+    )
+
+    assert response.status_code == 200
+    assert response.json()["role"] == "moderator"
+    assert query_count(response) == AUTH + 1
+
+
+async def test_unchanged_role_reads_row_once(client, create_user):
+    admin = await create_user(UserRole.ADMIN)
+    target = await create_user()
+
+    user_cache.clear()
+    response = await client.patch(
+        "/users/change-role",
+        json={"role": "user", "user_id": target.id},
+        headers=bearer(admin),
+    )
+
+    assert response.status_code == 200
+    # UPDATE не затронул строк, затем один SELECT для ответа
+    assert query_count(response) == AUTH + 2
+
+
+async def test_change_activity_is_single_update(client, create_user):
+    admin = await create_user(UserRole.ADMIN)
+    target = await create_user()
+
+    user_cache.clear()
+    response = await client.patch(
+        "/users/change-activity",
+        json={"activity_flag": False, "user_id": target.id},
+        headers=bearer(admin),
+    )
+
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+    assert query_count(response) == AUTH + 1
+
+
+@pytest.mark.parametrize(
+    "method, url, params",
+    [
+        ("patch", "/users/email", {"email": "round.trip@example.com"}),
+        ("patch", "/users/email-active", None),
+        ("patch", "/users/delete-email", None),
+    ],
+)
+async def test_email_mutations_are_single_update(client, create_user, method, url, params):
+    user = await create_user(email="current.email@example.com")
+
+    user_cache.clear()
+    response = await client.request(method, url, params=params, headers=bearer(user))
+
+    assert response.status_code == 200
+    assert query_count(response) == AUTH + 1
+
+
+async def test_change_nickname_is_single_update(client, create_user):
+    user = await create_user()
+
+    user_cache.clear()
+    response = await client.patch(
+        "/users/change-field",
+        json={"field": "nickname", "text": "Новый Никнейм"},
+        headers=bearer(user),
+    )
+
+    assert response.status_code == 200
+    assert query_count(response) == AUTH + 1
+
+
+async def test_change_password_round_trips(client, create_user):
+    user = await create_user()
+
+    user_cache.clear()
+    response = await client.patch(
+        "/users/change-field",
+        json={"field": "password", "text": "new-password"},
+        headers=bearer(user),
+    )
+
+    assert response.status_code == 200
+    # SELECT текущего хеша, UPDATE и INSERT отзыва сессий
+    assert query_count(response) == AUTH + 3
+
+
+async def test_delete_user_is_single_delete(client, create_user):
+    user = await create_user()
+
+    response = await client.delete("/users/delete", params={"user_id": user.id})
+
+    assert response.status_code == 204
+    assert query_count(response) == 1
+
+
+async def test_login_is_single_select(client, create_user):
+    user = await create_user()
+
+    response = await client.post(
+        "/users/login", data={"username": user.login, "password": PASSWORD}
+    )
+
+    assert response.status_code == 200
+    # last_login пишется пакетно в фоне
+    assert query_count(response) == 1
+
+
+async def test_me_reuses_authenticated_user(client, create_user):
+    user = await create_user()
+
+    user_cache.clear()
+    response = await client.get("/users/me", headers=bearer(user))
+
+    assert response.status_code == 200
+    assert response.json()["id"] == user.id
+    # Только загрузка пользователя при аутентификации, одно соединение на запрос
+    assert query_count(response) == AUTH
+
+    response = await client.get("/users/me", headers=bearer(user))
+    assert query_count(response) == 0
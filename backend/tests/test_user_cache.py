@@ -0,0 +1,35 @@
+from sqlalchemy import delete, update
+import pytest
+
+from app.database.database import AsyncSessionLocal
+from app.models.user import UserModel
+from app.repositories.user import get_user_out
+from app.services.user_cache import UserCache
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def _cached(cache: UserCache, user_id: int) -> None:
+    async with AsyncSessionLocal() as session:
+        cache.set(await get_user_out(session, user_id))
+
+
+async def test_sync_drops_users_changed_by_other_workers(create_user):
+    cache = UserCache()
+    changed, deleted, untouched = [await create_user() for _ in range(3)]
+    for user in (changed, deleted, untouched):
+        await _cached(cache, user.id)
+
+    # Изменения другого воркера: локальный кеш о них не знает
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(UserModel).where(UserModel.id == changed.id).values(is_active=False)
+        )
+        await session.execute(delete(UserModel).where(UserModel.id == deleted.id))
+        await session.commit()
+
+    assert await cache.sync() == 2
+    assert cache.get(changed.id) is None
+    assert cache.get(deleted.id) is None
+    assert cache.get(untouched.id) is not None